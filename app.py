@@ -1,5 +1,7 @@
 import streamlit as st
 
+from evcdp_core.timing import import_times, run_records, start_run, timed, timed_import
+
 # Set page configuration
 st.set_page_config(
     page_title="EVCD Demand Forecast",
@@ -28,7 +30,26 @@ pages = {
 # }
 
 selected_page = st.sidebar.radio("Go to:", list(pages.keys()))
+show_timing = st.sidebar.checkbox("Show timing report")
+
+# Dynamically load the selected page; heavy dependencies are imported only by the pages that use them
+start_run(selected_page)
+page_module = timed_import(pages[selected_page])
+with timed("render"):
+    page_module.render()
+
+# Timing report for this render and for the first import of each page
+if show_timing:
+    import pandas as pd
+
+    st.sidebar.markdown("### Timing report")
+    timings = pd.DataFrame(run_records(), columns=["Stage", "Seconds"])
+    timings["ms"] = (timings.pop("Seconds") * 1000).round(1)
+    st.sidebar.table(timings)
 
-# Dynamically load the selected page
-page_module = __import__(pages[selected_page], fromlist=[""])
-page_module.render()
+    st.sidebar.markdown("**Cold import per page (ms)**")
+    cold_imports = pd.DataFrame(
+        [(page, round(import_times[module] * 1000, 1)) for page, module in pages.items() if module in import_times],
+        columns=["Page", "ms"]
+    )
+    st.sidebar.table(cold_imports)
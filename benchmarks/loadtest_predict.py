@@ -0,0 +1,79 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evcdp_core.batching import MicroBatcher
+from evcdp_core.forecast import BACKENDS, MODEL_PATH, load_forecast_model
+
+
+# Run `users` threads that each send `requests` single-window predictions
+def run_load(predictor, users, requests, input_shape):
+    rng = np.random.default_rng(0)
+    windows = rng.random((users, 1) + tuple(input_shape[1:]), dtype=np.float32)
+    latencies = [[] for _ in range(users)]
+    start_barrier = threading.Barrier(users)
+
+    def user(index):
+        start_barrier.wait()
+        for _ in range(requests):
+            start = time.perf_counter()
+            predictor(windows[index])
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=user, args=(index,)) for index in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.concatenate(latencies)
+    return {
+        "throughput": users * requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare direct model.predict calls with the micro-batching service under concurrent load."
+    )
+    parser.add_argument("--model", default=MODEL_PATH, help="Path to the trained model")
+    parser.add_argument("--backend", choices=BACKENDS, default="numpy", help="Inference backend")
+    parser.add_argument("--users", type=int, default=32, help="Number of concurrent users")
+    parser.add_argument("--requests", type=int, default=50, help="Predictions per user")
+    parser.add_argument("--max-wait-ms", type=float, default=5, help="Micro-batch collection window")
+    args = parser.parse_args(argv)
+
+    model = load_forecast_model(args.model, args.backend)
+
+    # Direct calls are serialized, as one shared model would be across Streamlit sessions
+    lock = threading.Lock()
+
+    def direct(window):
+        with lock:
+            return model.predict(window, verbose=0)
+
+    batcher = MicroBatcher(model, max_wait=args.max_wait_ms / 1000)
+    results = {
+        "direct": run_load(direct, args.users, args.requests, model.input_shape),
+        "micro-batched": run_load(batcher.predict, args.users, args.requests, model.input_shape),
+    }
+    batcher.close()
+
+    for name, result in results.items():
+        print(f"{name:>14}: {result['throughput']:8.1f} req/s  "
+              f"p50 {result['p50_ms']:7.2f} ms  p95 {result['p95_ms']:7.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,222 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+# Every cache the pipeline writes, including the NumPy weight bundles, goes to a directory the benchmark
+# clears before each repeat, so cached stages start cold and the app's own .cache is never touched.
+# Set before evcdp_core is imported, which reads it once
+os.environ["EVCDP_CACHE_DIR"] = os.path.join(DATA_DIR, "cache")
+
+from benchmarks.synthetic import dataset_path
+from evcdp_core.datacache import CACHE_DIR, load_cached
+from evcdp_core.forecast import (
+    BACKEND,
+    BACKENDS,
+    MODEL_PATH,
+    WINDOW_DAYS,
+    forecast_horizon,
+    load_forecast_model,
+    normalize,
+    pivot_energy,
+)
+from evcdp_core.ingest import aggregate_daily, aggregate_daily_chunked, load_sessions
+from evcdp_core.scaler import load_scaler
+
+ROWS = [10_000, 1_000_000, 10_000_000]
+STATIONS = [14, 1000]
+# Buffers return to the pool that allocated them, so no stage's Arrow pool may be freed before exit
+_arrow_pools = []
+
+
+# Stages of the Prediction page and the EDA load, in order; each reads what earlier ones stored
+def pipeline_stages(model_path, backend, horizon, cache_dir):
+    from evcdp_pages.eda import parse_data
+
+    def predict(context):
+        window = context["temporal_data"].to_numpy()[-WINDOW_DAYS:]
+        return forecast_horizon(context["model"], [window], horizon)
+
+    return [
+        ("csv parse", "sessions", lambda context: load_sessions(context["path"])),
+        ("daily aggregation", "daily", lambda context: aggregate_daily(context["sessions"])),
+        ("chunked aggregation", None, lambda context: aggregate_daily_chunked(context["path"])),
+        ("scaling", "scaled", lambda context: normalize(context["daily"], load_scaler(model_path))[0]),
+        ("pivot", "temporal_data", lambda context: pivot_energy(context["scaled"])),
+        ("model load", "model", lambda context: load_forecast_model(model_path, backend)),
+        ("warm model load", None, lambda context: load_forecast_model(model_path, backend)),
+        ("predict", None, predict),
+        ("eda parse", None, lambda context: parse_data(context["path"])),
+        ("eda cache build", None,
+         lambda context: load_cached(context["path"], parse_data, cache_dir=cache_dir, memory_map=True)),
+        ("eda cache load", None,
+         lambda context: load_cached(context["path"], parse_data, cache_dir=cache_dir, memory_map=True)),
+    ]
+
+
+# Arrow allocates its buffers outside the Python allocator, so tracemalloc never sees them; each stage
+# gets its own proxy pool whose high-water mark counts only that stage's Arrow allocations
+def _arrow_pool():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None, None
+    parent = pa.default_memory_pool()
+    pool = pa.proxy_memory_pool(parent)
+    _arrow_pools.append(pool)
+    pa.set_memory_pool(pool)
+    return pool, parent
+
+
+def _restore_arrow_pool(parent):
+    if parent is not None:
+        import pyarrow as pa
+
+        pa.set_memory_pool(parent)
+
+
+# Run the stages once, timing each; with trace_memory the peak memory is recorded instead, as
+# (traced Python and NumPy peak, Arrow pool peak) in MiB
+def run_once(stages, path, trace_memory=False):
+    context, results = {"path": path}, {}
+    for name, output, stage in stages:
+        gc.collect()
+        if trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            pool, parent = _arrow_pool()
+        start = time.perf_counter()
+        try:
+            value = stage(context)
+        finally:
+            if trace_memory:
+                _restore_arrow_pool(parent)
+        elapsed = time.perf_counter() - start
+        if trace_memory:
+            results[name] = (
+                (tracemalloc.get_traced_memory()[1] - baseline) / 2 ** 20,
+                pool.max_memory() / 2 ** 20 if pool is not None else 0.0,
+            )
+        else:
+            results[name] = elapsed
+        if output:
+            context[output] = value
+        del value
+    return results
+
+
+# Remove the parsed-data caches and weight bundles left by the previous repeat
+def clear_cache(cache_dir):
+    for entry in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, entry)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+# Best-of-`repeat` stage times, then one traced pass for peak memory (tracing slows the code down)
+def benchmark(path, stages, repeat, cache_dir):
+    times = []
+    for _ in range(repeat):
+        clear_cache(cache_dir)
+        times.append(run_once(stages, path))
+
+    clear_cache(cache_dir)
+    tracemalloc.start()
+    try:
+        memory = run_once(stages, path, trace_memory=True)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        name: {
+            "seconds": min(run[name] for run in times),
+            # Both peaks added up: an upper bound when they fall at different moments of the stage
+            "peak_mib": sum(memory[name]),
+            "arrow_peak_mib": memory[name][1],
+        }
+        for name, _, _ in stages
+    }
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+# Stages that got slower than the baseline by more than the tolerance
+def regressions(results, baseline, tolerance):
+    previous = {(run["rows"], run["stations"]): run["stages"] for run in baseline["runs"]}
+    slower = []
+    for run in results["runs"]:
+        for name, stage in run["stages"].items():
+            before = previous.get((run["rows"], run["stations"]), {}).get(name)
+            if before and stage["seconds"] > before["seconds"] * (1 + tolerance):
+                slower.append((run["rows"], run["stations"], name, before["seconds"], stage["seconds"]))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time and measure peak memory of every pipeline stage on synthetic session logs."
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=ROWS, help="Session counts to benchmark")
+    parser.add_argument("--stations", type=int, nargs="+", default=STATIONS, help="Station counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per dataset; the best is kept")
+    parser.add_argument("--model", default=MODEL_PATH, help="Path to the trained model")
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND, help="Inference backend")
+    parser.add_argument("--horizon", type=int, default=7, help="Days forecast in the predict stage")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory for the generated session logs")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON file to write results to")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    stages = pipeline_stages(args.model, args.backend, args.horizon, CACHE_DIR)
+
+    results = {"environment": environment(), "backend": args.backend, "runs": []}
+    for rows in args.rows:
+        for stations in args.stations:
+            path = dataset_path(args.data_dir, rows, stations)
+            stage_results = benchmark(path, stages, args.repeat, CACHE_DIR)
+            results["runs"].append({"rows": rows, "stations": stations, "stages": stage_results})
+
+            print(f"{rows} rows, {stations} stations")
+            for name, stage in stage_results.items():
+                print(f"  {name:>20}: {stage['seconds'] * 1000:10.1f} ms  {stage['peak_mib']:8.1f} MiB"
+                      f" ({stage['arrow_peak_mib']:.1f} MiB Arrow)")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+        for rows, stations, name, before, after in slower:
+            print(f"Regression: {name} at {rows} rows, {stations} stations: "
+                  f"{before * 1000:.1f} ms -> {after * 1000:.1f} ms")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
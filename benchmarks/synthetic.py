@@ -0,0 +1,83 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['Timestamp', 'Station', 'Energy Delivered (kWh)', 'Duration (mins)', 'Latitude', 'Longitude']
+START = pd.Timestamp("2023-01-01")
+DAYS = 730
+# Relative session volume Monday..Sunday, giving the weekly cycle seen in the real data
+WEEKDAY_WEIGHTS = np.array([1.0, 0.95, 0.95, 1.0, 1.2, 1.35, 1.25])
+WRITE_CHUNK = 1_000_000
+
+
+# Stations spread over Peninsular Malaysia, with uneven popularity
+def make_stations(n_stations, rng):
+    return pd.DataFrame({
+        'Station': [f"Station {index:03d}" for index in range(1, n_stations + 1)],
+        'Latitude': rng.uniform(1.3, 6.7, n_stations),
+        'Longitude': rng.uniform(100.2, 104.2, n_stations),
+        'Weight': rng.gamma(2.0, 1.0, n_stations),
+    })
+
+
+# Random sessions in the schema of synthetic_ev_session_highways_my.csv
+def generate_sessions(n_rows, stations, rng, days=DAYS):
+    day_weights = WEEKDAY_WEIGHTS[(START.weekday() + np.arange(days)) % 7]
+    day = rng.choice(days, n_rows, p=day_weights / day_weights.sum())
+    seconds = day * 86400 + rng.integers(0, 86400, n_rows)
+    station = rng.choice(len(stations), n_rows, p=stations['Weight'] / stations['Weight'].sum())
+
+    duration = rng.integers(10, 120, n_rows)
+    return pd.DataFrame({
+        'Timestamp': START + pd.to_timedelta(seconds, unit='s'),
+        'Station': stations['Station'].to_numpy()[station],
+        'Energy Delivered (kWh)': (duration * rng.uniform(0.2, 0.6, n_rows)).round(2),
+        'Duration (mins)': duration,
+        'Latitude': stations['Latitude'].to_numpy()[station],
+        'Longitude': stations['Longitude'].to_numpy()[station],
+    }, columns=COLUMNS)
+
+
+# Write a session CSV in chunks so 10M-row files never sit in memory at once
+def write_sessions(path, n_rows, n_stations, seed=0, days=DAYS):
+    rng = np.random.default_rng(seed)
+    stations = make_stations(n_stations, rng)
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    for start in range(0, n_rows, WRITE_CHUNK):
+        chunk = generate_sessions(min(WRITE_CHUNK, n_rows - start), stations, rng, days)
+        chunk.to_csv(temp_path, mode="a" if start else "w", header=not start, index=False,
+                     date_format="%Y-%m-%d %H:%M:%S")
+    os.replace(temp_path, path)
+    return path
+
+
+# Generated files are reused between runs; the name pins rows, stations and seed
+def dataset_path(data_dir, n_rows, n_stations, seed=0):
+    path = os.path.join(data_dir, f"sessions_{n_rows}r_{n_stations}s_seed{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        write_sessions(path, n_rows, n_stations, seed)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic EV charging session log."
+    )
+    parser.add_argument("output", help="CSV file to write")
+    parser.add_argument("--rows", type=int, default=10_000, help="Number of sessions")
+    parser.add_argument("--stations", type=int, default=14, help="Number of stations")
+    parser.add_argument("--days", type=int, default=DAYS, help="Number of days covered")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args(argv)
+
+    write_sessions(args.output, args.rows, args.stations, args.seed, args.days)
+    print(f"Wrote {args.rows} sessions at {args.stations} stations to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+MAX_BATCH_SIZE = int(os.environ.get("EVCDP_MAX_BATCH_SIZE", "512"))
+MAX_WAIT = float(os.environ.get("EVCDP_BATCH_WAIT_MS", "5")) / 1000
+
+
+# Collects concurrent predict calls into micro-batches served by one worker thread
+class MicroBatcher:
+    def __init__(self, model, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._requests = queue.Queue()
+        # Requests submitted and not answered yet, whether queued or in the batch being collected
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._serve, name="evcdp-micro-batcher", daemon=True)
+        self._worker.start()
+
+    @property
+    def input_shape(self):
+        return self.model.input_shape
+
+    # Queue a batch of windows and return a future for their predictions
+    def submit(self, windows):
+        future = Future()
+        with self._in_flight_lock:
+            self._in_flight += 1
+        self._requests.put((np.asarray(windows, dtype=np.float32), future))
+        return future
+
+    # Same signature as model.predict, so the batcher can stand in for the model
+    def predict(self, windows, verbose=0):
+        return self.submit(windows).result()
+
+    def close(self):
+        self._requests.put(None)
+        self._worker.join()
+
+    def _answered(self, count):
+        with self._in_flight_lock:
+            self._in_flight -= count
+
+    # Take the first waiting request and everything queued behind it; wait up to max_wait only while
+    # another submitted request has not reached the queue yet, so a lone caller is served at once
+    def _collect(self):
+        first = self._requests.get()
+        if first is None:
+            return None
+
+        pending, rows = [first], len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_size:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                timeout = deadline - time.perf_counter()
+                if len(pending) >= self._in_flight or timeout <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if request is None:
+                # Serve what was collected, then stop
+                self._requests.put(None)
+                break
+            pending.append(request)
+            rows += len(request[0])
+        return pending
+
+    def _serve(self):
+        while True:
+            pending = self._collect()
+            if pending is None:
+                return
+
+            futures = [future for _, future in pending]
+            try:
+                predicted = self.model.predict(np.concatenate([windows for windows, _ in pending]), verbose=0)
+            except Exception as error:
+                self._answered(len(futures))
+                for future in futures:
+                    future.set_exception(error)
+                continue
+
+            # Hand every request its own slice of the batch
+            self._answered(len(futures))
+            bounds = np.cumsum([0] + [len(windows) for windows, _ in pending])
+            for future, start, end in zip(futures, bounds[:-1], bounds[1:]):
+                future.set_result(predicted[start:end])
@@ -0,0 +1,113 @@
+import io
+
+import numpy as np
+
+# Line charts send at most this many points to the browser
+MAX_POINTS = 2000
+# Longer series are drawn with WebGL, as plotly express does with render_mode="auto"
+WEBGL_POINTS = 1000
+
+
+# Numeric x positions for the triangle areas; datetimes become nanoseconds from the first point
+def _positions(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype(np.int64)
+    x = x.astype(np.float64)
+    return x - x[0]
+
+
+# Largest-Triangle-Three-Buckets: keep the first and last points and, from each bucket in between,
+# the point forming the largest triangle with the previous pick and the next bucket's average
+def lttb_indices(x, y, points):
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    x = _positions(x)
+    y = np.asarray(y, dtype=np.float64)
+
+    # points - 2 buckets over the interior points, with their averages in one pass
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / sizes, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / sizes, y[-1])
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs(
+            (x[previous] - mean_x[bucket + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+# Min-max decimation: keep the lowest and highest point of each bucket, so every peak survives
+def minmax_indices(y, points):
+    n = len(y)
+    if points >= n or points < 2:
+        return np.arange(n)
+
+    buckets = points // 2
+    bucket = np.arange(n) * buckets // n
+    # Within each bucket the lowest value sorts first and the highest last
+    order = np.lexsort((np.asarray(y), bucket))
+    starts = np.searchsorted(bucket, np.arange(buckets))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([order[starts], order[ends], [0, n - 1]]))
+
+
+# Point selection per downsampling method, from the x and y values and the number of points to keep
+DOWNSAMPLERS = {
+    "lttb": lttb_indices,
+    "minmax": lambda x, y, points: minmax_indices(y, points),
+}
+
+
+# Rows of a frame, sorted by x, reduced to about `points` rows
+def downsample(frame, x, y, points=MAX_POINTS, method="lttb"):
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"Unknown downsampling method: {method}; expected one of {', '.join(DOWNSAMPLERS)}")
+    return frame.iloc[DOWNSAMPLERS[method](frame[x].to_numpy(), frame[y].to_numpy(), points)]
+
+
+# Line chart of a long series, downsampled on the server and drawn with WebGL when it is long
+def line_figure(frame, x, y, title=None, labels=None, points=MAX_POINTS, method="lttb"):
+    import plotly.graph_objects as go
+
+    labels = labels or {}
+    sampled = downsample(frame, x, y, points, method)
+    trace = go.Scattergl if len(sampled) > WEBGL_POINTS else go.Scatter
+
+    fig = go.Figure(trace(x=sampled[x], y=sampled[y], mode="lines", name=labels.get(y, y)))
+    fig.update_layout(title=title, xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y))
+    return fig
+
+
+# Figures are cached as their JSON spec, which is what the browser receives anyway
+def figure_json(fig):
+    return fig.to_json()
+
+
+def figure_from_json(spec):
+    import plotly.io as pio
+
+    return pio.from_json(spec)
+
+
+# Render a matplotlib figure to PNG bytes once and release it
+def figure_png(fig, dpi=200):
+    import matplotlib.pyplot as plt
+
+    image = io.BytesIO()
+    try:
+        fig.savefig(image, format="png", dpi=dpi, bbox_inches="tight")
+    finally:
+        plt.close(fig)
+    return image.getvalue()
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import re
+
+import pandas as pd
+
+CACHE_DIR = os.environ.get("EVCDP_CACHE_DIR", ".cache")
+# A versioned derivation name, e.g. "parsed-v4"; every version shares the base name
+VERSION_SUFFIX = re.compile(r"-v\d+$")
+
+
+# Build a cache key from the source file's path, size and modification time
+def source_key(source):
+    stat = os.stat(source)
+    fingerprint = f"{os.path.abspath(source)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(fingerprint.encode()).hexdigest()[:16]
+
+
+# Hash the content of one or more files, e.g. to version a model and its scaler
+def file_digest(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()
+
+
+# Return the columnar cache path for a source file and a derivation name
+def cache_path(source, name, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(cache_dir, f"{stem}.{name}.{source_key(source)}.feather")
+
+
+# Remove caches of the same source file built from an older copy of it, or by another version
+# of the same derivation (e.g. parsed-v3 once parsed-v4 exists)
+def _remove_stale(path, stem, name):
+    directory, current = os.path.split(path)
+    key = current.rsplit(".", 2)[1]
+    base = VERSION_SUFFIX.sub("", name)
+    for entry in os.listdir(directory):
+        if entry == current or not entry.startswith(stem + ".") or not entry.endswith(".feather"):
+            continue
+        entry_name, _, entry_key = entry[len(stem) + 1:-len(".feather")].rpartition(".")
+        if entry_key != key or VERSION_SUFFIX.sub("", entry_name) == base:
+            try:
+                os.remove(os.path.join(directory, entry))
+            except OSError:
+                pass
+
+
+# Map an uncompressed, single-chunk Feather file; columns stay read-only views of the page cache,
+# so every process on the host that maps the same file shares one physical copy
+def read_mapped(path):
+    import pyarrow.feather as feather
+
+    return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+
+
+# Load a frame derived from a source file, rebuilding the on-disk cache when the source changes
+def load_cached(source, build, name="parsed", cache_dir=CACHE_DIR, memory_map=False):
+    try:
+        import pyarrow  # noqa: F401  (Feather support)
+    except ImportError:
+        return build(source)
+
+    path = cache_path(source, name, cache_dir)
+    if os.path.exists(path):
+        try:
+            return read_mapped(path) if memory_map else pd.read_feather(path)
+        except Exception:
+            # A truncated or incompatible cache is rebuilt below
+            pass
+
+    frame = build(source)
+
+    # Write to a temporary file first so concurrent readers never see a partial cache
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    # Mapping needs raw buffers in one record batch; compressed or chunked columns are copied on read
+    options = {"compression": "uncompressed", "chunksize": max(len(frame), 1)} if memory_map else {}
+    try:
+        frame.reset_index(drop=True).to_feather(temp_path, **options)
+        os.replace(temp_path, path)
+        _remove_stale(path, os.path.splitext(os.path.basename(source))[0], name)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return frame
+
+    # Serve the mapped file rather than the private copy that was just built
+    return read_mapped(path) if memory_map else frame
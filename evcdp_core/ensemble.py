@@ -0,0 +1,137 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from evcdp_core.evaluation import MODEL_FILES
+from evcdp_core.forecast import (
+    BACKEND,
+    BACKENDS,
+    PREDICTION_COLUMN,
+    WINDOW_DAYS,
+    denormalize,
+    forecast_horizon,
+    horizon_dates,
+    load_forecast_model,
+    prepare_daily,
+)
+from evcdp_core.ingest import aggregate_daily_chunked
+from evcdp_core.quantize import backend_path
+from evcdp_core.scaler import load_scaler
+
+
+# Models of the ensemble that can be served with a backend, e.g. only those with an int8 export
+def ensemble_members(backend=BACKEND, model_files=MODEL_FILES):
+    return {
+        name: path
+        for name, path in model_files.items()
+        if os.path.exists(path) and os.path.exists(backend_path(path, backend))
+    }
+
+
+# Load every member model with its scaler once
+def load_registry(backend=BACKEND, model_files=MODEL_FILES):
+    return {
+        name: (load_forecast_model(path, backend), load_scaler(path))
+        for name, path in ensemble_members(backend, model_files).items()
+    }
+
+
+# Scalers fitted on the same training data normalize identically, so their inputs are shared
+def _scaler_key(scaler):
+    if scaler is None:
+        return None
+    return tuple(np.concatenate([scaler.data_min_, scaler.data_max_]).tolist())
+
+
+def _timed_forecast(model, window, horizon):
+    start = time.perf_counter()
+    predicted = forecast_horizon(model, [window], horizon)[0]
+    return predicted, time.perf_counter() - start
+
+
+# Forecast with every model at once from one preprocessing pass; the spread across models is a cheap
+# uncertainty band. Models run in a thread pool, since NumPy's BLAS calls and TensorFlow release the GIL
+def forecast_ensemble(registry, daily, horizon=1, executor=None):
+    # Normalize and pivot once per distinct scaler; models trained on the same data share one pass
+    prepared = {}
+    for _, scaler in registry.values():
+        key = _scaler_key(scaler)
+        if key not in prepared:
+            prepared[key] = prepare_daily(daily, scaler)
+    normalized, temporal_data, _ = next(iter(prepared.values()))
+
+    result = {"daily": normalized, "temporal_data": temporal_data, "members": {}, "seconds": {},
+              "mean": None, "std": None}
+    # Ensure data has enough history
+    if len(temporal_data) < WINDOW_DAYS:
+        return result
+
+    windows = {key: data.tail(WINDOW_DAYS).to_numpy() for key, (_, data, _) in prepared.items()}
+    pool = executor or ThreadPoolExecutor(max_workers=len(registry), thread_name_prefix="evcdp-ensemble")
+    try:
+        futures = {
+            name: pool.submit(_timed_forecast, model, windows[_scaler_key(scaler)], horizon)
+            for name, (model, scaler) in registry.items()
+        }
+        for name, future in futures.items():
+            predicted, seconds = future.result()
+            _, _, input_scaler = prepared[_scaler_key(registry[name][1])]
+            result["members"][name] = denormalize(predicted, input_scaler)
+            result["seconds"][name] = seconds
+    finally:
+        if executor is None:
+            pool.shutdown()
+
+    # (models, periods, stations) -> mean and standard deviation per period and station
+    stacked = np.stack(list(result["members"].values()))
+    result["mean"], result["std"] = stacked.mean(axis=0), stacked.std(axis=0)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Forecast daily demand with every trained model and report their mean and spread."
+    )
+    parser.add_argument("sessions", help="Session CSV file to forecast")
+    parser.add_argument("-o", "--output", default="ensemble_predictions.csv", help="CSV file to write predictions to")
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND, help="Inference backend")
+    parser.add_argument("--horizon", type=int, default=1, help="Number of days to forecast ahead")
+    args = parser.parse_args(argv)
+
+    registry = load_registry(args.backend)
+    if not registry:
+        print("No model files found: " + ", ".join(MODEL_FILES.values()))
+        return 1
+
+    daily = aggregate_daily_chunked(args.sessions)
+    start = time.perf_counter()
+    result = forecast_ensemble(registry, daily, args.horizon)
+    elapsed = time.perf_counter() - start
+    if result["mean"] is None:
+        print(f"Not enough historical data for the last {WINDOW_DAYS} days.")
+        return 1
+
+    temporal_data = result["temporal_data"]
+    stations = temporal_data.columns
+    predictions = pd.DataFrame({
+        "Date": horizon_dates(temporal_data.index[-1], args.horizon).repeat(len(stations)),
+        "Station": np.tile(stations, args.horizon),
+        PREDICTION_COLUMN: result["mean"].ravel(),
+        "Spread (kWh)": result["std"].ravel(),
+        **{f"{name} (kWh)": predicted.ravel() for name, predicted in result["members"].items()},
+    })
+    predictions.to_csv(args.output, index=False)
+
+    for name, seconds in result["seconds"].items():
+        print(f"{name:>10}: {seconds * 1000:.1f} ms")
+    print(f"Ensemble of {len(registry)} models in {elapsed * 1000:.1f} ms; "
+          f"wrote {len(predictions)} predictions to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from evcdp_core.datacache import CACHE_DIR, file_digest
+from evcdp_core.forecast import WINDOW_DAYS, group_stations, load_forecast_model, prepare_daily, ungroup_stations
+from evcdp_core.ingest import CHUNK_SIZE, aggregate_daily_chunked
+from evcdp_core.scaler import fit_scaler, load_scaler, scaler_path
+from evcdp_core.training import split_windows
+
+MODEL_FILES = {
+    "LSTM": "lstm_ev_model.h5",
+    "CNN-LSTM": "cnnlstm_ev_model.h5",
+    "GRU": "gru_ev_model.h5",
+}
+PREDICT_BATCH = 8192
+# Backtest errors are compared in kWh, whatever scaler each model was trained with
+METRIC_UNITS = {"MSE": "kWh²", "RMSE": "kWh", "MAE": "kWh"}
+EVALUATION_VERSION = 2
+
+
+# Every rolling window of the series as one (starts, station groups, window, width) array
+def rolling_windows(values, width, window=WINDOW_DAYS):
+    groups = group_stations(values, width)
+    windows = np.lib.stride_tricks.sliding_window_view(groups, window, axis=1)
+    # (groups, starts, width, days) -> (starts, groups, days, width)
+    return np.ascontiguousarray(windows.transpose(1, 0, 3, 2))
+
+
+# Predict the day after every window, batched into as few model calls as possible
+def backtest(model, temporal_data):
+    values = temporal_data.to_numpy(dtype=np.float32)
+    width = model.input_shape[-1]
+    # The last day has no next day to check against
+    windows = rolling_windows(values[:-1], width)
+    n_starts, n_groups = windows.shape[:2]
+
+    flat = windows.reshape(-1, WINDOW_DAYS, width)
+    predicted = np.concatenate([
+        model.predict(flat[start:start + PREDICT_BATCH], verbose=0)
+        for start in range(0, len(flat), PREDICT_BATCH)
+    ])
+    predicted = ungroup_stations(predicted.reshape(n_starts, n_groups, width).transpose(1, 0, 2), values.shape[1])
+    return values[WINDOW_DAYS:], predicted
+
+
+def _metrics(actual, predicted, axis=None):
+    errors = predicted - actual
+    mse = np.mean(errors ** 2, axis=axis)
+    return {"MSE": mse, "RMSE": np.sqrt(mse), "MAE": np.mean(np.abs(errors), axis=axis)}
+
+
+def _overall(actual, predicted, train, test):
+    return {
+        "Training": {name: float(value) for name, value in _metrics(actual[train], predicted[train]).items()},
+        "Testing": {name: float(value) for name, value in _metrics(actual[test], predicted[test]).items()},
+    }
+
+
+# Walk-forward evaluation of one model over a daily aggregated dataset. Models may be scaled differently
+# (a saved training scaler, or one fitted on the dataset), so errors used to compare them are in kWh;
+# the normalized errors are kept to compare with the training metrics
+def evaluate_model(model, daily, scaler=None):
+    _, temporal_data, scaler = prepare_daily(daily, scaler)
+    actual, predicted = backtest(model, temporal_data)
+    train, _, test = split_windows(len(temporal_data))
+
+    energy_min, energy_max = scaler.data_min_[1], scaler.data_max_[1]
+    actual_kwh = actual * (energy_max - energy_min) + energy_min
+    predicted_kwh = predicted * (energy_max - energy_min) + energy_min
+    per_station = pd.DataFrame({
+        "Station": temporal_data.columns,
+        **{f"{name} ({METRIC_UNITS[name]})": values
+           for name, values in _metrics(actual_kwh[test], predicted_kwh[test], axis=0).items()},
+    })
+
+    return {
+        "overall": _overall(actual_kwh, predicted_kwh, train, test),
+        "overall_normalized": _overall(actual, predicted, train, test),
+        "per_station": per_station.to_dict(orient="list"),
+        # Network totals in kWh, for actual vs predicted charts
+        "series": {
+            "Date": [day.strftime("%Y-%m-%d") for day in temporal_data.index[WINDOW_DAYS:]],
+            "Actual": actual_kwh.sum(axis=1).tolist(),
+            "Predicted": predicted_kwh.sum(axis=1).tolist(),
+            "Testing": np.isin(np.arange(len(actual)), test).tolist(),
+        },
+    }
+
+
+# Model files present on disk, in display order
+def available_models(model_files=MODEL_FILES):
+    return {name: path for name, path in model_files.items() if os.path.exists(path)}
+
+
+# Version of every model file and its scaler, used to key cached evaluations
+def models_digest(models):
+    return file_digest(*[file for path in models.values() for file in (path, scaler_path(path))])
+
+
+# Evaluate every available model on a dataset, reusing results cached by dataset and model hash
+def evaluate(dataset, model_files=MODEL_FILES, cache_dir=CACHE_DIR, dataset_digest=None):
+    models = available_models(model_files)
+    dataset_digest = dataset_digest or file_digest(dataset)
+    model_digest = models_digest(models)
+    cache_path = os.path.join(
+        cache_dir, f"evaluation.v{EVALUATION_VERSION}.{dataset_digest[:16]}.{model_digest[:16]}.json"
+    )
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            return json.load(f)
+
+    daily = aggregate_daily_chunked(dataset, CHUNK_SIZE)
+    n_days = daily['Timestamp'].nunique()
+    if n_days < WINDOW_DAYS + 2:
+        raise ValueError(f"The dataset covers {n_days} days; a backtest needs at least {WINDOW_DAYS + 2}.")
+
+    results = {}
+    for name, path in models.items():
+        model = load_forecast_model(path)
+        # Models without a saved scaler are evaluated with one fitted on the dataset
+        scaler = load_scaler(path) or fit_scaler(daily)
+        results[name] = evaluate_model(model, daily, scaler)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_path, "w") as f:
+        json.dump(results, f)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Walk-forward backtest of the demand models on a session log."
+    )
+    parser.add_argument("sessions", help="Session CSV to evaluate on")
+    args = parser.parse_args(argv)
+
+    results = evaluate(args.sessions)
+    for name, result in results.items():
+        for split, metrics in result["overall"].items():
+            print(f"{name:>8} {split:<8} "
+                  + "  ".join(f"{key} {value:.6f} {METRIC_UNITS[key]}" for key, value in metrics.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,263 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from evcdp_core.ingest import (
+    DURATION_COLUMN,
+    ENERGY_COLUMN,
+    FREQUENCIES,
+    aggregate_daily,
+    aggregate_daily_chunked,
+    load_sessions,
+)
+from evcdp_core.npmodel import load_numpy_model
+from evcdp_core.scaler import load_scaler
+
+MODEL_PATH = "cnnlstm_ev_model.h5"
+# "numpy" runs the model without TensorFlow; "keras" loads it with Keras;
+# "tflite-float16" / "tflite-int8" run the variants exported by evcdp_core.quantize
+BACKEND = os.environ.get("EVCDP_BACKEND", "numpy")
+BACKENDS = ["numpy", "keras", "tflite-float16", "tflite-int8"]
+WINDOW_DAYS = 7
+WINDOW_HOURS = 7 * 24
+PREDICTION_COLUMN = "Predicted Energy (kWh)"
+# Model, input window and time unit per aggregation granularity
+GRANULARITIES = {
+    "daily": {"model": MODEL_PATH, "window": WINDOW_DAYS, "unit": "days", "steps_per_day": 1},
+    "hourly": {"model": "cnnlstm_ev_model_hourly.h5", "window": WINDOW_HOURS, "unit": "hours", "steps_per_day": 24},
+}
+
+
+# Load the trained forecasting model
+def load_forecast_model(model_path=MODEL_PATH, backend=BACKEND):
+    if backend.startswith("tflite-"):
+        from evcdp_core.quantize import load_tflite_model, quantized_path
+
+        return load_tflite_model(quantized_path(model_path, backend[len("tflite-"):]))
+    if backend == "numpy":
+        try:
+            return load_numpy_model(model_path)
+        except NotImplementedError:
+            # Architectures the NumPy runtime cannot execute fall back to Keras
+            pass
+    elif backend != "keras":
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    # Keras is imported here so the engine can be imported without TensorFlow
+    from keras.models import load_model
+    from keras.metrics import MeanSquaredError
+
+    # Explicitly map the 'mse' loss function
+    return load_model(model_path, custom_objects={"mse": MeanSquaredError()})
+
+
+# Normalize energy and duration with a saved scaler, or fit one on this data
+def normalize(daily, scaler=None):
+    daily = daily.copy()
+    if scaler is not None:
+        daily[[DURATION_COLUMN, ENERGY_COLUMN]] = scaler.transform(
+            daily[[DURATION_COLUMN, ENERGY_COLUMN]].to_numpy()
+        )
+        return daily, scaler
+
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler = MinMaxScaler()
+    daily[[DURATION_COLUMN, ENERGY_COLUMN]] = scaler.fit_transform(
+        daily[[DURATION_COLUMN, ENERGY_COLUMN]]
+    )
+    return daily, scaler
+
+
+# Pivot the daily energy into a days x stations time series
+def pivot_energy(daily):
+    return daily.pivot(
+        index='Timestamp',
+        columns='Station',
+        values=ENERGY_COLUMN
+    ).fillna(0)
+
+
+# Place aggregated energy on a complete periods x stations grid with one vectorized scatter
+def resample_energy(daily, freq):
+    station_codes, stations = pd.factorize(daily['Station'], sort=True)
+    timestamps = daily['Timestamp'].to_numpy()
+    if len(timestamps) == 0:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='Timestamp'), columns=pd.Index(stations, name='Station'))
+
+    periods = pd.date_range(timestamps.min(), timestamps.max(), freq=freq, name='Timestamp')
+    step = pd.Timedelta(periods.freq).to_timedelta64()
+    positions = (timestamps - periods[0].to_datetime64()) // step
+
+    values = np.zeros((len(periods), len(stations)))
+    values[positions, station_codes] = daily[ENERGY_COLUMN].to_numpy()
+    return pd.DataFrame(values, index=periods, columns=pd.Index(stations, name='Station'))
+
+
+# Run normalization and pivoting for daily (or hourly) aggregated sessions
+def prepare_daily(daily, scaler=None, granularity="daily"):
+    daily, scaler = normalize(daily, scaler)
+    if granularity == "daily":
+        # Daily series keep only the days with sessions, as the daily models were trained
+        temporal_data = pivot_energy(daily)
+    else:
+        # Hourly series need every hour, since most nights have no sessions anywhere
+        temporal_data = resample_energy(daily, FREQUENCIES[granularity])
+    return daily, temporal_data, scaler
+
+
+# Map normalized predictions back to kWh
+def denormalize(predicted, scaler):
+    energy_min = scaler.data_min_[1]  # 'Energy Delivered (kWh)' min
+    energy_max = scaler.data_max_[1]  # 'Energy Delivered (kWh)' max
+    return predicted * (energy_max - energy_min) + energy_min
+
+
+# Split a (days, stations) window into model-sized station groups
+def group_stations(window, width):
+    # Stations keep their column order; the last group is padded with all-zero stations
+    n_groups = -(-window.shape[1] // width)
+    padded = np.zeros((window.shape[0], n_groups * width), dtype=np.float32)
+    padded[:, :window.shape[1]] = window
+    return padded.reshape(window.shape[0], n_groups, width).transpose(1, 0, 2)
+
+
+# Join per-group predictions of shape (groups, ..., width) back into (..., stations)
+def ungroup_stations(predicted, n_stations):
+    joined = np.moveaxis(predicted, 0, -2)
+    return joined.reshape(joined.shape[:-2] + (-1,))[..., :n_stations]
+
+
+# Forecast several days ahead by feeding each prediction back into the window
+def forecast_horizon(model, windows, horizon):
+    width = model.input_shape[-1]
+
+    # Every station group of every window goes into one batch
+    groups = [group_stations(np.asarray(window, dtype=np.float32), width) for window in windows]
+    bounds = np.cumsum([0] + [len(group) for group in groups])
+    batch = np.concatenate(groups)
+    steps = np.empty((batch.shape[0], horizon, width), dtype=np.float32)
+    # Padding slots of each window's last station group stay zero as the window rolls forward
+    real = np.concatenate([
+        np.arange(len(group) * width).reshape(len(group), width) < np.shape(window)[1]
+        for window, group in zip(windows, groups)
+    ])
+
+    # One batched predict call per day, covering every window at once
+    for step in range(horizon):
+        steps[:, step] = np.where(real, model.predict(batch, verbose=0), 0)
+        batch = np.concatenate([batch[:, 1:], steps[:, step:step + 1]], axis=1)
+
+    # One (horizon, stations) array per input window
+    return [
+        ungroup_stations(steps[start:end], np.shape(window)[1])
+        for window, start, end in zip(windows, bounds[:-1], bounds[1:])
+    ]
+
+
+# Dates covered by a forecast that starts the period after the last observed one
+def horizon_dates(last_day, horizon, freq='D'):
+    step = pd.tseries.frequencies.to_offset(freq)
+    return pd.date_range(last_day + step, periods=horizon, freq=step)
+
+
+# Split sessions or daily aggregates into station groups using a column such as a region
+def split_groups(frame, column):
+    return {
+        str(name): group.drop(columns=column)
+        for name, group in frame.groupby(column, sort=True)
+    }
+
+
+# Forecast energy for many daily (or hourly) aggregated inputs at once; horizon counts periods
+def forecast(model, inputs, horizon=1, scaler=None, granularity="daily"):
+    window, unit = GRANULARITIES[granularity]["window"], GRANULARITIES[granularity]["unit"]
+    windows, prepared, skipped = [], [], {}
+
+    for name, daily in inputs.items():
+        daily, temporal_data, input_scaler = prepare_daily(daily, scaler, granularity)
+
+        # Ensure data has enough history
+        if len(temporal_data) < window:
+            skipped[name] = f"Not enough historical data for the last {window} {unit}."
+            continue
+
+        windows.append(temporal_data.tail(window).values)
+        prepared.append((name, temporal_data.index[-1], temporal_data.columns, input_scaler))
+
+    frames = []
+    if windows:
+        predicted_normalized = forecast_horizon(model, windows, horizon)
+        for (name, last_day, station_names, input_scaler), predicted in zip(prepared, predicted_normalized):
+            # One row per (day, station), days first
+            frames.append(pd.DataFrame({
+                "Source": name,
+                "Date": horizon_dates(last_day, horizon, FREQUENCIES[granularity]).repeat(len(station_names)),
+                "Station": np.tile(station_names, horizon),
+                PREDICTION_COLUMN: denormalize(predicted, input_scaler).ravel()
+            }))
+
+    if frames:
+        predictions = pd.concat(frames, ignore_index=True)
+    else:
+        predictions = pd.DataFrame(columns=["Source", "Date", "Station", PREDICTION_COLUMN])
+    return predictions, skipped
+
+
+# Aggregate the session logs named on the command line
+def collect_inputs(paths, group_by=None, chunksize=None, freq='D'):
+    inputs = {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+
+        if chunksize:
+            daily = aggregate_daily_chunked(path, chunksize=chunksize, group_by=group_by, freq=freq)
+            groups = split_groups(daily, group_by) if group_by else {None: daily}
+        elif group_by:
+            groups = {
+                group: aggregate_daily(group_sessions, freq)
+                for group, group_sessions in split_groups(load_sessions(path), group_by).items()
+            }
+        else:
+            groups = {None: aggregate_daily(load_sessions(path), freq)}
+
+        for group, daily in groups.items():
+            inputs[name if group is None else f"{name}/{group}"] = daily
+    return inputs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Forecast daily or hourly EV charging demand for one or more session logs."
+    )
+    parser.add_argument("sessions", nargs="+", help="Session CSV files to forecast")
+    parser.add_argument("-o", "--output", default="predictions.csv", help="CSV file to write predictions to")
+    parser.add_argument("--granularity", choices=sorted(GRANULARITIES), default="daily",
+                        help="Aggregate and forecast per day or per hour")
+    parser.add_argument("--model", help="Path to the trained model (default: the granularity's model)")
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND, help="Inference backend")
+    parser.add_argument("--group-by", help="Column used to split each file into station groups (e.g. a region)")
+    parser.add_argument("--horizon", type=int, default=1, help="Number of periods (days or hours) to forecast ahead")
+    parser.add_argument("--chunksize", type=int, help="Read the session files in chunks of this many rows")
+    args = parser.parse_args(argv)
+
+    model_path = args.model or GRANULARITIES[args.granularity]["model"]
+    inputs = collect_inputs(args.sessions, args.group_by, args.chunksize, FREQUENCIES[args.granularity])
+    model = load_forecast_model(model_path, args.backend)
+    scaler = load_scaler(model_path)
+    if scaler is None:
+        print(f"No saved scaler found for {model_path}; fitting one per input.")
+    predictions, skipped = forecast(model, inputs, args.horizon, scaler, args.granularity)
+
+    for name, reason in skipped.items():
+        print(f"Skipped {name}: {reason}")
+
+    predictions.to_csv(args.output, index=False)
+    print(f"Wrote {len(predictions)} predictions for {len(inputs) - len(skipped)} inputs to {args.output}")
+    return 0 if len(predictions) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from evcdp_core.forecast import (
+    MODEL_PATH,
+    PREDICTION_COLUMN,
+    WINDOW_DAYS,
+    denormalize,
+    forecast_horizon,
+    horizon_dates,
+    load_forecast_model,
+    normalize,
+    pivot_energy,
+)
+from evcdp_core.ingest import (
+    DURATION_COLUMN,
+    ENERGY_COLUMN,
+    aggregate_daily,
+    aggregate_daily_chunked,
+    load_sessions,
+)
+from evcdp_core.scaler import load_scaler
+
+STATE_PATH = os.environ.get("EVCDP_STATE_PATH", "daily_state.npz")
+# Number of applied delta hashes remembered to reject duplicate uploads
+APPLIED_HISTORY = 1000
+# Serializes updates between the threads of one process; the file lock covers other processes
+_state_lock = threading.Lock()
+
+
+# Empty rolling state: the last 7 observed days of energy and duration per station
+def empty_state():
+    return {
+        "days": np.array([], dtype="datetime64[D]"),
+        "stations": np.array([], dtype=str),
+        "energy": np.zeros((0, 0)),
+        "duration": np.zeros((0, 0)),
+        "seen": np.zeros((0, 0), dtype=bool),
+        "latitude": np.array([]),
+        "longitude": np.array([]),
+        "applied": np.array([], dtype=str),
+    }
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return empty_state()
+    with np.load(path) as saved:
+        return {name: saved[name] for name in saved.files}
+
+
+def save_state(state, path=STATE_PATH):
+    # Write a uniquely named file next to the target and swap, so neither a crash nor a concurrent
+    # writer ever leaves a half-written state
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **state)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+# Hold the state exclusively for a read-modify-write, across threads and (where flock exists) processes
+@contextmanager
+def locked_state(path=STATE_PATH):
+    with _state_lock, open(f"{path}.lock", "a") as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# Add columns for stations seen for the first time
+def _add_stations(state, daily):
+    new = daily.drop_duplicates('Station')
+    new = new[~new['Station'].isin(state["stations"])]
+    if new.empty:
+        return state
+
+    state = dict(state)
+    state["stations"] = np.concatenate([state["stations"], new['Station'].to_numpy(dtype=str)])
+    state["latitude"] = np.concatenate([state["latitude"], new['Latitude'].to_numpy(dtype=float)])
+    state["longitude"] = np.concatenate([state["longitude"], new['Longitude'].to_numpy(dtype=float)])
+    padding = ((0, 0), (0, len(new)))
+    for name in ("energy", "duration", "seen"):
+        state[name] = np.pad(state[name], padding)
+    return state
+
+
+# Make room for a day, keeping the window sorted and at most 7 days long
+def _add_day(state, day):
+    days = state["days"]
+    if len(days) >= WINDOW_DAYS and day < days[0]:
+        return state, None  # Older than the window; no longer affects the forecast
+
+    position = int(np.searchsorted(days, day))
+    state = dict(state)
+    state["days"] = np.insert(days, position, day)
+    for name in ("energy", "duration", "seen"):
+        state[name] = np.insert(state[name], position, 0, axis=0)
+
+    if len(state["days"]) > WINDOW_DAYS:
+        for name in ("days", "energy", "duration", "seen"):
+            state[name] = state[name][1:]
+        position -= 1
+    return state, position
+
+
+# Fold daily aggregates into the state; costs O(rows of the delta), not O(history)
+def apply_daily(state, daily):
+    if daily.empty:
+        return state
+    state = _add_stations(state, daily)
+
+    columns = pd.Index(state["stations"]).get_indexer(daily['Station'])
+    days = daily['Timestamp'].to_numpy().astype("datetime64[D]")
+    for day in np.unique(days):
+        rows = np.flatnonzero(days == day)
+        if day in state["days"]:
+            position = int(np.searchsorted(state["days"], day))
+        else:
+            state, position = _add_day(state, day)
+            if position is None:
+                continue
+        np.add.at(state["energy"][position], columns[rows], daily[ENERGY_COLUMN].to_numpy()[rows])
+        np.add.at(state["duration"][position], columns[rows], daily[DURATION_COLUMN].to_numpy()[rows])
+        state["seen"][position, columns[rows]] = True
+    return state
+
+
+# Apply the content of a delta file once; re-applying the same content is a no-op
+def apply_delta(state, content):
+    digest = hashlib.sha256(content).hexdigest()
+    if digest in state["applied"]:
+        return state, False
+
+    state = apply_daily(state, aggregate_daily(load_sessions(io.BytesIO(content))))
+    state["applied"] = np.append(state["applied"], digest)[-APPLIED_HISTORY:]
+    return state, True
+
+
+# Apply delta files to the saved state under the lock, so concurrent updates are never lost
+def update_state(contents, path=STATE_PATH):
+    with locked_state(path):
+        state, applied = load_state(path), []
+        for content in contents:
+            state, was_applied = apply_delta(state, content)
+            applied.append(was_applied)
+        if any(applied):
+            save_state(state, path)
+    return state, applied
+
+
+# Build the state from a full session history
+def init_state(source, chunksize=None):
+    daily = aggregate_daily_chunked(source, chunksize) if chunksize else aggregate_daily(load_sessions(source))
+    return apply_daily(empty_state(), daily)
+
+
+# Station-days of the state that had sessions, in the layout aggregate_daily() returns
+def state_daily(state):
+    positions, columns = np.nonzero(state["seen"])
+    return pd.DataFrame({
+        'Station': state["stations"][columns],
+        'Timestamp': state["days"][positions].astype("datetime64[ns]"),
+        ENERGY_COLUMN: state["energy"][positions, columns],
+        DURATION_COLUMN: state["duration"][positions, columns],
+        'Latitude': state["latitude"][columns],
+        'Longitude': state["longitude"][columns],
+    }).sort_values(['Station', 'Timestamp'], ignore_index=True)
+
+
+# Normalize and pivot the state; stations without sessions in the window stay as zero columns
+def prepare_state(state, scaler=None):
+    daily, scaler = normalize(state_daily(state), scaler)
+    temporal_data = pivot_energy(daily).reindex(columns=np.sort(state["stations"]), fill_value=0)
+    return daily, temporal_data, scaler
+
+
+# Forecast from the state without touching the historical sessions
+def forecast_state(model, state, horizon=1, scaler=None):
+    if len(state["days"]) < WINDOW_DAYS:
+        return None
+
+    _, temporal_data, scaler = prepare_state(state, scaler)
+    predicted = forecast_horizon(model, [temporal_data.values], horizon)[0]
+    return pd.DataFrame({
+        "Date": horizon_dates(temporal_data.index[-1], horizon).repeat(temporal_data.shape[1]),
+        "Station": np.tile(temporal_data.columns, horizon),
+        PREDICTION_COLUMN: denormalize(predicted, scaler).ravel()
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Keep a rolling 7-day state of daily station demand and forecast from it."
+    )
+    parser.add_argument("--state", default=STATE_PATH, help="Path of the saved daily state")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init", help="Build the state from a full session history")
+    init.add_argument("sessions", help="Session CSV with the full history")
+    init.add_argument("--chunksize", type=int, help="Read the history in chunks of this many rows")
+
+    update = commands.add_parser("update", help="Append new sessions to the state")
+    update.add_argument("deltas", nargs="+", help="Session CSVs with only the new sessions")
+
+    predict = commands.add_parser("forecast", help="Forecast from the state")
+    predict.add_argument("-o", "--output", default="predictions.csv", help="CSV file to write predictions to")
+    predict.add_argument("--model", default=MODEL_PATH, help="Path to the trained model")
+    predict.add_argument("--horizon", type=int, default=1, help="Number of days to forecast ahead")
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        state = init_state(args.sessions, args.chunksize)
+        with locked_state(args.state):
+            save_state(state, args.state)
+        print(f"Initialised {args.state} with {len(state['stations'])} stations and {len(state['days'])} days")
+    elif args.command == "update":
+        contents = []
+        for delta in args.deltas:
+            with open(delta, "rb") as f:
+                contents.append(f.read())
+        _, applied = update_state(contents, args.state)
+        for delta, was_applied in zip(args.deltas, applied):
+            print(f"{'Applied' if was_applied else 'Already applied'}: {delta}")
+    else:
+        state = load_state(args.state)
+        model = load_forecast_model(args.model)
+        predictions = forecast_state(model, state, args.horizon, load_scaler(args.model))
+        if predictions is None:
+            print(f"The state holds {len(state['days'])} days; at least {WINDOW_DAYS} are needed.")
+            return 1
+        predictions.to_csv(args.output, index=False)
+        print(f"Wrote {len(predictions)} predictions to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,75 @@
+import pandas as pd
+
+from evcdp_core.schema import DURATION_COLUMN, ENERGY_COLUMN, iter_csv, read_csv, validate
+
+CHUNK_SIZE = 500_000
+SUM_COLUMNS = [ENERGY_COLUMN, DURATION_COLUMN]
+FIRST_COLUMNS = ['Latitude', 'Longitude']
+# Aggregation periods, as pandas frequency aliases
+FREQUENCIES = {"daily": "D", "hourly": "h"}
+
+
+# Read a session log with explicit column types and reject invalid rows before any aggregation
+def load_sessions(source):
+    return validate(read_csv(source))
+
+
+# Aggregate the sessions into daily (or hourly, with freq='h') totals per station
+def aggregate_daily(sessions, freq='D'):
+    sessions = sessions.sort_values(by='Timestamp')
+    return sessions.set_index('Timestamp').groupby(
+        ['Station', pd.Grouper(freq=freq)]
+    ).agg({
+        ENERGY_COLUMN: 'sum',
+        DURATION_COLUMN: 'sum',
+        'Latitude': 'first',
+        'Longitude': 'first'
+    }).reset_index()
+
+
+# Reduce one chunk of sessions to daily partial aggregates per station
+def _partial_daily(chunk, keys, freq='D'):
+    # Sorting only the chunk keeps 'first' in time order without a global sort
+    chunk = chunk.sort_values(by='Timestamp', kind='stable')
+    chunk['Day'] = chunk['Timestamp'].dt.floor(freq)
+
+    # Remember when each first value was seen so partials can be merged later
+    for column in FIRST_COLUMNS:
+        chunk[f"{column} at"] = chunk['Timestamp'].where(chunk[column].notna())
+
+    grouped = chunk.groupby(keys + ['Day'], sort=False)
+    partial = grouped[SUM_COLUMNS].sum()
+    first_columns = [name for column in FIRST_COLUMNS for name in (column, f"{column} at")]
+    partial[first_columns] = grouped[first_columns].first()
+    return partial
+
+
+# Merge partial aggregates, keeping the earliest first value per group
+def _combine(state, partial):
+    combined = partial if state is None else pd.concat([state, partial])
+    levels = list(range(combined.index.nlevels))
+
+    merged = combined.groupby(level=levels)[SUM_COLUMNS].sum()
+    for column in FIRST_COLUMNS:
+        pair = [column, f"{column} at"]
+        ordered = combined[pair].sort_values(by=f"{column} at", kind='stable')
+        merged[pair] = ordered.groupby(level=levels).first()
+    return merged
+
+
+# Aggregate a session log into daily totals per station, one chunk at a time
+def aggregate_daily_chunked(source, chunksize=CHUNK_SIZE, group_by=None, freq='D'):
+    keys = ([group_by] if group_by else []) + ['Station']
+    usecols = keys + ['Timestamp'] + SUM_COLUMNS + FIRST_COLUMNS
+
+    # Every chunk is validated before it is aggregated, so a bad row stops the run early
+    state, offset = None, 0
+    for chunk in iter_csv(source, chunksize, usecols):
+        state = _combine(state, _partial_daily(validate(chunk, offset), keys, freq))
+        offset += len(chunk)
+
+    if state is None:
+        return pd.DataFrame(columns=keys + ['Timestamp'] + SUM_COLUMNS + FIRST_COLUMNS)
+
+    daily = state[SUM_COLUMNS + FIRST_COLUMNS].reset_index()
+    return daily.rename(columns={'Day': 'Timestamp'})
@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+
+from evcdp_core.datacache import CACHE_DIR, file_digest
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 0.5 * (np.tanh(0.5 * x) + 1),  # overflow-free logistic
+}
+
+
+def _activation(name):
+    if name not in ACTIVATIONS:
+        raise NotImplementedError(f"Unsupported activation: {name}")
+    return ACTIVATIONS[name]
+
+
+def _conv1d(x, config, weights):
+    kernel, bias = weights if config["use_bias"] else (weights[0], None)
+    if config["padding"] == "same":
+        span = (kernel.shape[0] - 1) * config["dilation_rate"][0]
+        x = np.pad(x, ((0, 0), (span // 2, span - span // 2), (0, 0)))
+    elif config["padding"] != "valid":
+        raise NotImplementedError(f"Unsupported Conv1D padding: {config['padding']}")
+
+    # Gather every receptive field as (batch, steps, kernel, channels) and contract once
+    dilation, stride = config["dilation_rate"][0], config["strides"][0]
+    span = (kernel.shape[0] - 1) * dilation + 1
+    fields = np.lib.stride_tricks.sliding_window_view(x, span, axis=1)[:, ::stride, :, ::dilation]
+    out = np.einsum("btck,kcf->btf", fields, kernel)
+    if bias is not None:
+        out = out + bias
+    return _activation(config["activation"])(out)
+
+
+def _max_pooling1d(x, config, weights):
+    if config["padding"] != "valid":
+        raise NotImplementedError(f"Unsupported MaxPooling1D padding: {config['padding']}")
+    pool, stride = config["pool_size"][0], config["strides"][0]
+    windows = np.lib.stride_tricks.sliding_window_view(x, pool, axis=1)[:, ::stride]
+    return windows.max(axis=-1)
+
+
+def _lstm(x, config, weights):
+    kernel, recurrent_kernel, bias = weights
+    units = config["units"]
+    activation = _activation(config["activation"])
+    recurrent_activation = _activation(config["recurrent_activation"])
+
+    # Project every timestep's input at once; only the recurrence is sequential
+    projected = x @ kernel + bias
+    h = np.zeros((x.shape[0], units), dtype=x.dtype)
+    c = np.zeros_like(h)
+    outputs = []
+    for t in range(x.shape[1]):
+        z = projected[:, t] + h @ recurrent_kernel
+        i = recurrent_activation(z[:, :units])
+        f = recurrent_activation(z[:, units:2 * units])
+        g = activation(z[:, 2 * units:3 * units])
+        o = recurrent_activation(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * activation(c)
+        outputs.append(h)
+    return np.stack(outputs, axis=1) if config["return_sequences"] else h
+
+
+def _gru(x, config, weights):
+    kernel, recurrent_kernel, bias = weights
+    if not config.get("reset_after", True):
+        raise NotImplementedError("Only GRU layers with reset_after=True are supported")
+    units = config["units"]
+    activation = _activation(config["activation"])
+    recurrent_activation = _activation(config["recurrent_activation"])
+
+    input_bias, recurrent_bias = bias
+    projected = x @ kernel + input_bias
+    h = np.zeros((x.shape[0], units), dtype=x.dtype)
+    outputs = []
+    for t in range(x.shape[1]):
+        x_t = projected[:, t]
+        recurrent = h @ recurrent_kernel + recurrent_bias
+        z = recurrent_activation(x_t[:, :units] + recurrent[:, :units])
+        r = recurrent_activation(x_t[:, units:2 * units] + recurrent[:, units:2 * units])
+        candidate = activation(x_t[:, 2 * units:] + r * recurrent[:, 2 * units:])
+        h = z * h + (1 - z) * candidate
+        outputs.append(h)
+    return np.stack(outputs, axis=1) if config["return_sequences"] else h
+
+
+def _dense(x, config, weights):
+    out = x @ weights[0]
+    if config["use_bias"]:
+        out = out + weights[1]
+    return _activation(config["activation"])(out)
+
+
+def _flatten(x, config, weights):
+    return x.reshape(x.shape[0], -1)
+
+
+def _identity(x, config, weights):
+    return x
+
+
+LAYERS = {
+    "Conv1D": _conv1d,
+    "MaxPooling1D": _max_pooling1d,
+    "LSTM": _lstm,
+    "GRU": _gru,
+    "Dense": _dense,
+    "Flatten": _flatten,
+    "Dropout": _identity,  # Dropout is inactive at inference time
+}
+
+
+# Forward pass of a sequential Keras model in plain NumPy
+class NumpyModel:
+    def __init__(self, input_shape, layers, dtype=np.float32):
+        self.input_shape = tuple(input_shape)
+        self.layers = layers
+        self.dtype = dtype
+
+    def predict(self, x, verbose=0, batch_size=None):
+        out = np.asarray(x, dtype=self.dtype)
+        for class_name, config, weights in self.layers:
+            out = LAYERS[class_name](out, config, weights)
+        return out.astype(np.float32, copy=False)
+
+    __call__ = predict
+
+
+# Read the architecture and weights saved by Keras into an .h5 file
+def read_h5_model(model_path):
+    import h5py
+
+    with h5py.File(model_path, "r") as f:
+        model_config = json.loads(f.attrs["model_config"])
+        weight_root = f["model_weights"]
+
+        layers, input_shape = [], None
+        for layer in model_config["config"]["layers"]:
+            class_name, config = layer["class_name"], layer["config"]
+            if class_name == "InputLayer":
+                input_shape = config.get("batch_shape") or config.get("batch_input_shape")
+                continue
+            if class_name not in LAYERS:
+                raise NotImplementedError(f"Unsupported layer type: {class_name}")
+
+            group = weight_root[config["name"]]
+            weight_names = [name.decode() if isinstance(name, bytes) else name
+                            for name in group.attrs.get("weight_names", [])]
+            weights = [np.asarray(group[name]) for name in weight_names]
+            layers.append((class_name, config, weights))
+
+    return input_shape, layers
+
+
+# Weight bundle of one model version: a manifest plus one .npy file per weight array
+def bundle_path(model_path, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(cache_dir, f"{stem}.{file_digest(model_path)[:16]}.weights")
+
+
+def write_weight_bundle(path, input_shape, layers):
+    # Build in a private directory and rename, so readers never see a partial bundle
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(temp_path)
+    manifest = {"input_shape": list(input_shape), "layers": []}
+    for index, (class_name, config, weights) in enumerate(layers):
+        files = [f"{index:03d}_{position}.npy" for position in range(len(weights))]
+        for name, weight in zip(files, weights):
+            np.save(os.path.join(temp_path, name), np.ascontiguousarray(weight, dtype=np.float32))
+        manifest["layers"].append({"class_name": class_name, "config": config, "weights": files})
+    with open(os.path.join(temp_path, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        # Another process published the same bundle first
+        shutil.rmtree(temp_path, ignore_errors=True)
+        return
+
+    # Drop bundles of older versions of the model; processes still mapping them keep their pages
+    directory, prefix = os.path.split(path)
+    prefix = prefix.rsplit(".", 2)[0] + "."
+    for entry in os.listdir(directory or "."):
+        if entry.startswith(prefix) and entry.endswith(".weights") and entry != os.path.basename(path):
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+# Memory-map a weight bundle read-only; processes on the same host share its pages
+def read_weight_bundle(path):
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    layers = [
+        (layer["class_name"], layer["config"],
+         [np.asarray(np.load(os.path.join(path, name), mmap_mode="r")) for name in layer["weights"]])
+        for layer in manifest["layers"]
+    ]
+    return manifest["input_shape"], layers
+
+
+def load_numpy_model(model_path, dtype=np.float32, memory_map=True):
+    if memory_map and np.dtype(dtype) == np.float32:
+        path = bundle_path(model_path)
+        try:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                write_weight_bundle(path, *read_h5_model(model_path))
+            return NumpyModel(*read_weight_bundle(path), dtype=dtype)
+        except OSError:
+            # Without a writable cache the weights are read into private memory below
+            pass
+
+    input_shape, layers = read_h5_model(model_path)
+    layers = [
+        (class_name, config, [weight.astype(dtype) for weight in weights])
+        for class_name, config, weights in layers
+    ]
+    return NumpyModel(input_shape, layers, dtype=dtype)
+
+
+# Compare the NumPy forward pass with Keras on random inputs
+def check_against_keras(model_path, samples=256, seed=0):
+    from evcdp_core.forecast import load_forecast_model
+
+    numpy_model = load_numpy_model(model_path)
+    keras_model = load_forecast_model(model_path, backend="keras")
+
+    rng = np.random.default_rng(seed)
+    inputs = rng.random((samples,) + numpy_model.input_shape[1:], dtype=np.float32)
+    expected = keras_model.predict(inputs, verbose=0)
+    actual = numpy_model.predict(inputs)
+    return float(np.max(np.abs(expected - actual)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check the NumPy inference backend against Keras for a saved model."
+    )
+    parser.add_argument("model", nargs="?", default="cnnlstm_ev_model.h5", help="Path to the .h5 model")
+    parser.add_argument("--samples", type=int, default=256, help="Number of random input windows")
+    parser.add_argument("--atol", type=float, default=1e-5, help="Maximum allowed absolute difference")
+    args = parser.parse_args(argv)
+
+    max_diff = check_against_keras(args.model, args.samples)
+    print(f"Max absolute difference vs Keras over {args.samples} windows: {max_diff:.3g}")
+    return 0 if max_diff <= args.atol else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
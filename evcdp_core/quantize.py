@@ -0,0 +1,203 @@
+import argparse
+import importlib.util
+import os
+import threading
+import time
+
+import numpy as np
+
+from evcdp_core.forecast import BACKENDS, MODEL_PATH, load_forecast_model
+
+PRECISIONS = ["float16", "int8"]
+
+
+# Quantized models are exported next to the original, e.g. cnnlstm_ev_model.int8.tflite
+def quantized_path(model_path, precision):
+    return f"{os.path.splitext(model_path)[0]}.{precision}.tflite"
+
+
+# Copy of a Keras model with its recurrent layers unrolled over the 7-day window
+def _unrolled(model):
+    import keras
+
+    def clone(layer):
+        config = layer.get_config()
+        if "unroll" in config:
+            config["unroll"] = True
+        return layer.__class__.from_config(config)
+
+    # Unrolled recurrences convert to plain TFLite ops that accept any batch size
+    unrolled = keras.models.clone_model(model, clone_function=clone)
+    unrolled.set_weights(model.get_weights())
+    return unrolled
+
+
+# Convert an .h5 model to a TFLite flatbuffer with float16 or int8 (dynamic range) weights
+def export_tflite(model_path, precision, output=None):
+    import tensorflow as tf
+
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(
+        _unrolled(load_forecast_model(model_path, backend="keras"))
+    )
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if precision == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+
+    output = output or quantized_path(model_path, precision)
+    with open(output, "wb") as f:
+        f.write(converter.convert())
+    return output
+
+
+STANDALONE_RUNTIMES = ["ai_edge_litert", "tflite_runtime"]
+
+
+# Whether a TFLite runtime that does not import TensorFlow is installed
+def has_standalone_runtime():
+    return any(importlib.util.find_spec(name) is not None for name in STANDALONE_RUNTIMES)
+
+
+# Prefer the standalone TFLite runtimes, which do not import TensorFlow
+def _interpreter_class():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+# TFLite interpreter behind the same predict() interface as the Keras and NumPy models
+class TFLiteModel:
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self._interpreter = _interpreter_class()(model_path=model_path)
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = None
+        # One interpreter holds its tensors in place, so calls are serialized
+        self._lock = threading.Lock()
+        self.input_shape = (None,) + tuple(int(size) for size in self._input["shape_signature"][1:])
+
+    def predict(self, x, verbose=0, batch_size=None):
+        x = np.asarray(x, dtype=np.float32)
+        with self._lock:
+            if len(x) != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input["index"], x.shape)
+                self._interpreter.allocate_tensors()
+                self._batch_size = len(x)
+            self._interpreter.set_tensor(self._input["index"], x)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output["index"]).copy()
+
+    __call__ = predict
+
+
+def load_tflite_model(model_path):
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"{model_path} not found; export it with `python -m evcdp_core.quantize export`")
+    return TFLiteModel(model_path)
+
+
+# File a backend loads the model from
+def backend_path(model_path, backend):
+    if backend.startswith("tflite-"):
+        return quantized_path(model_path, backend[len("tflite-"):])
+    return model_path
+
+
+# Backends that can serve a model: the original runtimes plus every exported variant. Without
+# `tensorflow_fallback`, TFLite variants are only offered when a standalone runtime can run them
+def available_backends(model_path=MODEL_PATH, tensorflow_fallback=True):
+    tflite = tensorflow_fallback or has_standalone_runtime()
+    return [
+        backend for backend in BACKENDS
+        if os.path.exists(backend_path(model_path, backend)) and (tflite or not backend.startswith("tflite-"))
+    ]
+
+
+# Steady-state latency of one predict call, in milliseconds
+def _timed_predict(model, windows):
+    model.predict(windows, verbose=0)  # Warm up, including any tensor allocation
+    start = time.perf_counter()
+    predicted = model.predict(windows, verbose=0)
+    return predicted, (time.perf_counter() - start) * 1000
+
+
+# Prediction differences and latency of a candidate model against the reference on the same windows
+def accuracy_delta(reference, candidate, windows):
+    windows = np.asarray(windows, dtype=np.float32)
+    expected, reference_ms = _timed_predict(reference, windows)
+    predicted, predict_ms = _timed_predict(candidate, windows)
+
+    errors = predicted - expected
+    return {
+        "Max abs diff": float(np.max(np.abs(errors))),
+        "MAE": float(np.mean(np.abs(errors))),
+        "RMSE": float(np.sqrt(np.mean(errors ** 2))),
+        "Reference ms": reference_ms,
+        "Predict ms": predict_ms,
+    }
+
+
+# Accuracy delta, latency and file size of every backend against the full-precision model
+def backend_report(model_path, windows, backends=None, reference="numpy"):
+    reference_model = load_forecast_model(model_path, reference)
+    report = {}
+    for backend in backends or available_backends(model_path):
+        report[backend] = {
+            "File kB": os.path.getsize(backend_path(model_path, backend)) / 1024,
+            **accuracy_delta(reference_model, load_forecast_model(model_path, backend), windows),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export reduced-precision TFLite variants of a model and compare them with the original."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Write float16 and/or int8 TFLite variants of a model")
+    export.add_argument("model", nargs="?", default=MODEL_PATH, help="Path to the .h5 model")
+    export.add_argument("--precision", nargs="+", choices=PRECISIONS, default=PRECISIONS, help="Variants to export")
+
+    report = commands.add_parser("report", help="Compare every available backend with the original model")
+    report.add_argument("model", nargs="?", default=MODEL_PATH, help="Path to the .h5 model")
+    report.add_argument("--sessions", help="Session CSV to draw windows from (random windows if omitted)")
+    report.add_argument("--samples", type=int, default=512, help="Number of windows to compare on")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        for precision in args.precision:
+            path = export_tflite(args.model, precision)
+            print(f"{precision}: {path} ({os.path.getsize(path) / 1024:.1f} kB)")
+        return 0
+
+    input_shape = load_forecast_model(args.model).input_shape
+    if args.sessions:
+        from evcdp_core.evaluation import rolling_windows
+        from evcdp_core.forecast import prepare_daily
+        from evcdp_core.ingest import aggregate_daily_chunked
+        from evcdp_core.scaler import load_scaler
+
+        _, temporal_data, _ = prepare_daily(aggregate_daily_chunked(args.sessions), load_scaler(args.model))
+        windows = rolling_windows(temporal_data.to_numpy(dtype=np.float32), input_shape[-1])
+        windows = windows.reshape((-1,) + tuple(input_shape[1:]))[-args.samples:]
+    else:
+        windows = np.random.default_rng(0).random((args.samples,) + tuple(input_shape[1:]), dtype=np.float32)
+
+    for backend, result in backend_report(args.model, windows).items():
+        print(f"{backend:>15}: " + "  ".join(f"{key} {value:.4g}" for key, value in result.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
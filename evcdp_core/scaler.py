@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from evcdp_core.ingest import DURATION_COLUMN, ENERGY_COLUMN, aggregate_daily, load_sessions
+
+SCALER_VERSION = 1
+FEATURES = [DURATION_COLUMN, ENERGY_COLUMN]
+
+
+# Min-max scaling parameters fitted at training time
+class SavedScaler:
+    def __init__(self, data_min, data_max, features=FEATURES, version=SCALER_VERSION):
+        self.data_min_ = np.asarray(data_min, dtype=np.float64)
+        self.data_max_ = np.asarray(data_max, dtype=np.float64)
+        self.features = list(features)
+        self.version = version
+
+    def transform(self, values):
+        data_range = self.data_max_ - self.data_min_
+        # Constant features map to 0, as with MinMaxScaler
+        data_range[data_range == 0] = 1
+        return (np.asarray(values, dtype=np.float64) - self.data_min_) / data_range
+
+
+# The scaler artefact lives next to the model it was trained with
+def scaler_path(model_path):
+    return os.path.splitext(model_path)[0] + ".scaler.json"
+
+
+def save_scaler(scaler, path):
+    artefact = {
+        "version": SCALER_VERSION,
+        "features": FEATURES,
+        "data_min": [float(value) for value in scaler.data_min_],
+        "data_max": [float(value) for value in scaler.data_max_],
+    }
+    with open(path, "w") as f:
+        json.dump(artefact, f, indent=2)
+
+
+# Load the scaler saved for a model, or None when the model has no artefact
+def load_scaler(model_path):
+    path = scaler_path(model_path)
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        artefact = json.load(f)
+    if artefact.get("version") != SCALER_VERSION:
+        raise ValueError(f"Unsupported scaler version {artefact.get('version')} in {path}")
+    if artefact["features"] != FEATURES:
+        raise ValueError(f"Scaler in {path} was fitted on {artefact['features']}, expected {FEATURES}")
+    return SavedScaler(artefact["data_min"], artefact["data_max"], artefact["features"], artefact["version"])
+
+
+# Fit the scaler on the daily aggregates of a training session log
+def fit_scaler(daily):
+    values = daily[FEATURES].to_numpy(dtype=np.float64)
+    return SavedScaler(np.nanmin(values, axis=0), np.nanmax(values, axis=0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fit the min-max scaler on a training session log and save it next to the model."
+    )
+    parser.add_argument("sessions", help="Training session CSV")
+    parser.add_argument("--model", default="cnnlstm_ev_model.h5", help="Model the scaler belongs to")
+    args = parser.parse_args(argv)
+
+    scaler = fit_scaler(aggregate_daily(load_sessions(args.sessions)))
+    path = scaler_path(args.model)
+    save_scaler(scaler, path)
+    print(f"Saved scaler fitted on {args.sessions} to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,156 @@
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+
+ENERGY_COLUMN = "Energy Delivered (kWh)"
+DURATION_COLUMN = "Duration (mins)"
+# Columns every session log has, and the type each is parsed as; timestamps are ISO 8601
+COLUMN_TYPES = {
+    "Timestamp": "datetime64[ns]",
+    "Station": "string",
+    ENERGY_COLUMN: "float64",
+    DURATION_COLUMN: "float64",
+    "Latitude": "float64",
+    "Longitude": "float64",
+}
+# Columns that may not be empty; sessions without coordinates are kept
+NOT_NULL = ["Timestamp", "Station", ENERGY_COLUMN, DURATION_COLUMN]
+NON_NEGATIVE = [ENERGY_COLUMN, DURATION_COLUMN]
+COORDINATE_RANGES = {"Latitude": (-90.0, 90.0), "Longitude": (-180.0, 180.0)}
+# Bytes parsed per Arrow block when streaming a log in chunks, and a typical row's length
+BLOCK_SIZE = 1 << 24
+ROW_BYTES = 64
+
+
+# A session log that does not match the expected columns, types or value ranges
+class SchemaError(ValueError):
+    pass
+
+
+# Column names from the first line of a CSV path or file-like object, leaving the object where it was
+def read_header(source):
+    if hasattr(source, "read"):
+        position = source.tell()
+        line = source.readline()
+        source.seek(position)
+    else:
+        with open(source, "rb") as f:
+            line = f.readline()
+    if isinstance(line, bytes):
+        line = line.decode("utf-8-sig")
+    return next(csv.reader([line]), [])
+
+
+# Fail before any parsing when required columns are missing
+def check_columns(source, columns):
+    missing = [column for column in columns if column not in read_header(source)]
+    if missing:
+        raise SchemaError(f"The session log is missing the column(s): {', '.join(missing)}")
+
+
+def _arrow_options(usecols):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    types = {"datetime64[ns]": pa.timestamp("ns"), "string": pa.string(), "float64": pa.float64()}
+    return pacsv.ConvertOptions(
+        include_columns=usecols,
+        column_types={column: types[dtype] for column, dtype in COLUMN_TYPES.items()},
+        timestamp_parsers=[pacsv.ISO8601],
+        strings_can_be_null=True,
+    )
+
+
+# Arrow only reads bytes, so text streams such as io.StringIO are encoded first
+def _binary(source):
+    if isinstance(source, io.TextIOBase):
+        return io.BytesIO(source.read().encode("utf-8"))
+    return source
+
+
+# Without pyarrow the C engine parses the same types, more slowly
+def _pandas_dtypes():
+    return {column: "str" if dtype == "string" else dtype
+            for column, dtype in COLUMN_TYPES.items() if dtype != "datetime64[ns]"}
+
+
+def _pandas_timestamps(frame):
+    if "Timestamp" in frame:
+        frame["Timestamp"] = pd.to_datetime(frame["Timestamp"], format="ISO8601")
+    return frame
+
+
+# Read a whole session log with explicit column types
+def read_csv(source, usecols=None):
+    check_columns(source, usecols or list(COLUMN_TYPES))
+    try:
+        import pyarrow.csv as pacsv
+    except ImportError:
+        try:
+            return _pandas_timestamps(pd.read_csv(source, usecols=usecols, dtype=_pandas_dtypes()))
+        except ValueError as error:
+            raise SchemaError(f"Could not parse the session log: {error}") from error
+
+    try:
+        return pacsv.read_csv(_binary(source), convert_options=_arrow_options(usecols)).to_pandas()
+    except ValueError as error:
+        raise SchemaError(f"Could not parse the session log: {error}") from error
+
+
+# Stream a session log as frames of at least `chunksize` rows (the last may be shorter)
+def iter_csv(source, chunksize, usecols=None):
+    check_columns(source, usecols or list(COLUMN_TYPES))
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        try:
+            for chunk in pd.read_csv(source, chunksize=chunksize, usecols=usecols, dtype=_pandas_dtypes()):
+                yield _pandas_timestamps(chunk)
+        except ValueError as error:
+            raise SchemaError(f"Could not parse the session log: {error}") from error
+        return
+
+    try:
+        reader = pacsv.open_csv(_binary(source), read_options=pacsv.ReadOptions(block_size=min(BLOCK_SIZE, max(chunksize * ROW_BYTES, 1 << 16))),
+                                convert_options=_arrow_options(usecols))
+        batches, rows = [], 0
+        for batch in reader:
+            batches.append(batch)
+            rows += batch.num_rows
+            if rows >= chunksize:
+                yield pa.Table.from_batches(batches).to_pandas()
+                batches, rows = [], 0
+        if batches:
+            yield pa.Table.from_batches(batches).to_pandas()
+    except ValueError as error:
+        raise SchemaError(f"Could not parse the session log: {error}") from error
+
+
+# Vectorized checks for empty values, negative totals and impossible coordinates;
+# `offset` is the position of the frame's first row in the file, for the error message
+def validate(frame, offset=0):
+    problems = []
+
+    def report(mask, description):
+        count = int(np.count_nonzero(mask))
+        if count:
+            first = offset + int(np.argmax(mask)) + 1
+            problems.append(f"{count} row(s) with {description} (first at data row {first})")
+
+    for column in NOT_NULL:
+        if column in frame:
+            report(frame[column].isna().to_numpy(), f"no {column}")
+    for column in NON_NEGATIVE:
+        if column in frame:
+            report(frame[column].to_numpy() < 0, f"negative {column}")
+    for column, (low, high) in COORDINATE_RANGES.items():
+        if column in frame:
+            values = frame[column].to_numpy()
+            report((values < low) | (values > high), f"{column} outside {low:g} to {high:g}")
+
+    if problems:
+        raise SchemaError("Invalid session log: " + "; ".join(problems))
+    return frame
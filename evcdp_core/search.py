@@ -0,0 +1,245 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from evcdp_core.forecast import GRANULARITIES
+from evcdp_core.training import ARCHITECTURES, compile_model, load_series, split_windows
+
+# Values tried per hyperparameter; the hand-tuned defaults (64 -> 32 units, 0.2 dropout) are included
+SEARCH_SPACE = {
+    "units": [(32, 16), (64, 32), (128, 64)],
+    "dropout": [0.0, 0.1, 0.2, 0.3],
+    "learning_rate": [3e-4, 1e-3, 3e-3],
+    "batch_size": [32, 64, 128],
+}
+# Extra hyperparameters of the convolutional front end
+CNN_SEARCH_SPACE = {
+    "filters": [32, 64],
+    "kernel_size": [2, 3],
+}
+SPLITS = ["train", "validation", "test"]
+# Windows timed for each trial's inference latency
+LATENCY_WINDOWS = 256
+
+
+# Random configurations spread evenly over the architectures, reproducible from the seed
+def sample_trials(architectures, n_trials, seed=0):
+    rng = np.random.default_rng(seed)
+    trials = []
+    for number in range(n_trials):
+        architecture = architectures[number % len(architectures)]
+        space = {**SEARCH_SPACE, **(CNN_SEARCH_SPACE if architecture == "cnnlstm" else {})}
+        config = {}
+        for name, values in space.items():
+            value = values[rng.integers(len(values))]
+            config[name] = list(value) if isinstance(value, tuple) else value
+        trials.append({"trial": number, "architecture": architecture, "config": config})
+    return trials
+
+
+# Materialize the (window, next period) pairs of every split once as .npy files the workers map read-only
+def write_windows(series, splits, directory, window):
+    os.makedirs(directory, exist_ok=True)
+    # (groups, starts, stations, window + 1) views; nothing is copied until written
+    pairs = np.lib.stride_tricks.sliding_window_view(series, window + 1, axis=1)
+    width = series.shape[-1]
+
+    for name, starts in zip(SPLITS, splits):
+        n = len(starts)
+        x = np.lib.format.open_memmap(os.path.join(directory, f"{name}_x.npy"), mode="w+",
+                                      dtype=np.float32, shape=(series.shape[0] * n, window, width))
+        y = np.lib.format.open_memmap(os.path.join(directory, f"{name}_y.npy"), mode="w+",
+                                      dtype=np.float32, shape=(series.shape[0] * n, width))
+        # One station group at a time keeps the copy bounded
+        for group in range(series.shape[0]):
+            samples = pairs[group, starts].transpose(0, 2, 1)
+            x[group * n:(group + 1) * n] = samples[:, :window]
+            y[group * n:(group + 1) * n] = samples[:, window]
+        x.flush()
+        y.flush()
+        del x, y
+    return directory
+
+
+def read_windows(directory, split):
+    return (
+        np.load(os.path.join(directory, f"{split}_x.npy"), mmap_mode="r"),
+        np.load(os.path.join(directory, f"{split}_y.npy"), mmap_mode="r"),
+    )
+
+
+# Batches gathered straight from the mapped windows, so no worker holds its own copy of the dataset
+def mapped_dataset(x, y, batch_size=32, shuffle=False, seed=0):
+    import tensorflow as tf
+
+    dataset = tf.data.Dataset.from_tensor_slices(np.arange(len(x)))
+    if shuffle:
+        dataset = dataset.shuffle(len(x), seed=seed, reshuffle_each_iteration=True)
+
+    def gather(indices):
+        # Sorted indices read the mapped file front to back
+        indices = np.sort(indices)
+        return np.asarray(x[indices]), np.asarray(y[indices])
+
+    def load(indices):
+        batch_x, batch_y = tf.numpy_function(gather, [indices], [tf.float32, tf.float32])
+        batch_x.set_shape((None,) + x.shape[1:])
+        batch_y.set_shape((None,) + y.shape[1:])
+        return batch_x, batch_y
+
+    return dataset.batch(batch_size).map(load, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+
+# Validation loss per epoch of the trials finished so far, as logged by the parent process
+def _logged_losses(log_path):
+    losses = []
+    if os.path.exists(log_path):
+        with open(log_path) as f:
+            for line in f:
+                losses.append(json.loads(line)["history"].get("val_loss", []))
+    return losses
+
+
+# Median pruning: after `warmup` epochs, stop a trial whose validation loss is worse than the median
+# of the finished trials at the same epoch
+def _pruning_callback(log_path, warmup, min_trials):
+    import keras
+
+    class MedianPruning(keras.callbacks.Callback):
+        pruned = False
+
+        def on_epoch_end(self, epoch, logs=None):
+            if epoch + 1 < warmup or logs is None:
+                return
+            others = [losses[epoch] for losses in _logged_losses(log_path) if len(losses) > epoch]
+            if len(others) >= min_trials and logs["val_loss"] > np.median(others):
+                self.pruned = True
+                self.model.stop_training = True
+
+    return MedianPruning()
+
+
+# Train and evaluate one configuration in a worker process
+def run_trial(trial, data_dir, log_path, epochs=50, patience=5, warmup=5, min_trials=3, threads=1):
+    import keras
+    import tensorflow as tf
+
+    # Cores are split between the workers rather than oversubscribed by each
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+    keras.utils.set_random_seed(trial["trial"])
+
+    config = dict(trial["config"])
+    batch_size, learning_rate = config.pop("batch_size"), config.pop("learning_rate")
+    if "units" in config:
+        config["units"] = tuple(config["units"])
+
+    data = {split: read_windows(data_dir, split) for split in SPLITS}
+    model = compile_model(trial["architecture"], data["train"][0].shape[1:], learning_rate, **config)
+
+    pruning = _pruning_callback(log_path, warmup, min_trials)
+    start = time.perf_counter()
+    history = model.fit(
+        mapped_dataset(*data["train"], batch_size, shuffle=True, seed=trial["trial"]),
+        validation_data=mapped_dataset(*data["validation"], batch_size),
+        epochs=epochs,
+        callbacks=[keras.callbacks.EarlyStopping(patience=patience, restore_best_weights=True), pruning],
+        verbose=0,
+    )
+    train_seconds = time.perf_counter() - start
+
+    metrics = {}
+    for name, split in (("Validation", "validation"), ("Testing", "test")):
+        mse, rmse, mae = model.evaluate(mapped_dataset(*data[split], batch_size), verbose=0)
+        metrics[name] = {"MSE": mse, "RMSE": rmse, "MAE": mae}
+
+    # Steady-state latency of one batched predict, to weigh accuracy against serving cost
+    windows = np.asarray(data["validation"][0][:LATENCY_WINDOWS])
+    model.predict(windows, verbose=0)
+    start = time.perf_counter()
+    model.predict(windows, verbose=0)
+    predict_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        **trial,
+        "status": "pruned" if pruning.pruned else "complete",
+        "epochs_trained": len(history.history["loss"]),
+        "train_seconds": train_seconds,
+        "predict_ms": predict_ms,
+        "parameters": model.count_params(),
+        "metrics": metrics,
+        "history": {key: [float(value) for value in values] for key, values in history.history.items()},
+    }
+
+
+# Run the trials across a process pool, appending each result to a JSONL log as it finishes
+def search(trials, data_dir, log_path, workers=None, epochs=50, patience=5, warmup=5, min_trials=3):
+    workers = workers or os.cpu_count()
+    threads = max(1, os.cpu_count() // workers)
+    results = []
+
+    # TensorFlow is not fork-safe, so every worker starts from a fresh interpreter
+    context = multiprocessing.get_context("spawn")
+    with open(log_path, "w") as log, ProcessPoolExecutor(workers, mp_context=context) as pool:
+        futures = [
+            pool.submit(run_trial, trial, data_dir, log_path, epochs, patience, warmup, min_trials, threads)
+            for trial in trials
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            log.write(json.dumps(result) + "\n")
+            log.flush()
+            results.append(result)
+            print(f"trial {result['trial']:>3} {result['architecture']:>8} {result['status']:>8}: "
+                  f"validation MSE {result['metrics']['Validation']['MSE']:.6f} "
+                  f"in {result['train_seconds']:.1f}s ({result['epochs_trained']} epochs)")
+    return sorted(results, key=lambda result: result["metrics"]["Validation"]["MSE"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Search layer sizes, dropout and training settings of the demand models with parallel trials."
+    )
+    parser.add_argument("sessions", help="Training session CSV")
+    parser.add_argument("--arch", nargs="+", choices=sorted(ARCHITECTURES), default=sorted(ARCHITECTURES),
+                        help="Architecture families to search")
+    parser.add_argument("--trials", type=int, default=24, help="Number of configurations to try")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Trials trained in parallel")
+    parser.add_argument("--epochs", type=int, default=50, help="Maximum number of epochs per trial")
+    parser.add_argument("--patience", type=int, default=5, help="Early-stopping patience in epochs")
+    parser.add_argument("--warmup", type=int, default=5, help="Epochs before a trial can be pruned")
+    parser.add_argument("--min-trials", type=int, default=3,
+                        help="Finished trials needed before pruning against their median")
+    parser.add_argument("--granularity", choices=sorted(GRANULARITIES), default="daily",
+                        help="Search on daily (7-day windows) or hourly (168-hour windows) series")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for sampling configurations")
+    parser.add_argument("--out-dir", default="search", help="Directory for the shared windows and the trial log")
+    args = parser.parse_args(argv)
+
+    window = GRANULARITIES[args.granularity]["window"]
+    series, _ = load_series(args.sessions, granularity=args.granularity)
+    data_dir = write_windows(series, split_windows(series.shape[1], window=window),
+                             os.path.join(args.out_dir, "windows"), window)
+
+    trials = sample_trials(args.arch, args.trials, args.seed)
+    log_path = os.path.join(args.out_dir, "trials.jsonl")
+    results = search(trials, data_dir, log_path, args.workers, args.epochs, args.patience, args.warmup,
+                     args.min_trials)
+
+    print(f"Best trials by validation MSE (log: {log_path}):")
+    for result in results[:5]:
+        print(f"  trial {result['trial']:>3} {result['architecture']:>8}: "
+              f"validation MSE {result['metrics']['Validation']['MSE']:.6f} "
+              f"test MSE {result['metrics']['Testing']['MSE']:.6f} "
+              f"train {result['train_seconds']:.1f}s predict {result['predict_ms']:.1f} ms "
+              f"{result['parameters']} params {json.dumps(result['config'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
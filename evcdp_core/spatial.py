@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from evcdp_core.forecast import PREDICTION_COLUMN
+
+# Finest web-map tile zoom indexed; a zoom-16 tile is about 600 m across
+MAX_ZOOM = 16
+# Web Mercator cannot project the poles
+MAX_LATITUDE = 85.05112878
+
+
+# Slippy-map tile column and row of each coordinate at a zoom level, as used by map tile servers
+def tile_coordinates(latitude, longitude, zoom):
+    n = 2 ** zoom
+    latitude = np.radians(np.clip(np.asarray(latitude, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(longitude, dtype=np.float64) + 180.0) / 360.0 * n
+    y = (1.0 - np.arcsinh(np.tan(latitude)) / np.pi) / 2.0 * n
+    return np.clip(x.astype(np.int64), 0, n - 1), np.clip(y.astype(np.int64), 0, n - 1)
+
+
+# One tile key column per zoom level (z0 .. zMAX_ZOOM) for every station with coordinates
+def build_index(daily, max_zoom=MAX_ZOOM):
+    locations = daily.groupby('Station', sort=True)[['Latitude', 'Longitude']].first().dropna()
+    latitude, longitude = locations['Latitude'].to_numpy(), locations['Longitude'].to_numpy()
+
+    keys = {}
+    for zoom in range(max_zoom + 1):
+        x, y = tile_coordinates(latitude, longitude, zoom)
+        keys[f"z{zoom}"] = x * 2 ** zoom + y
+    return pd.concat([locations, pd.DataFrame(keys, index=locations.index)], axis=1)
+
+
+# Finest zoom whose tiles hold the stations in at most `max_points` clusters
+def auto_zoom(index, max_points, max_zoom=MAX_ZOOM):
+    zoom = 0
+    for level in range(max_zoom + 1):
+        if index[f"z{level}"].nunique() > max_points:
+            break
+        zoom = level
+    return zoom
+
+
+# Sum station values per tile at a zoom level (or per station without one);
+# each cluster sits at its stations' mean position
+def cluster(index, values, zoom=None, column=PREDICTION_COLUMN):
+    stations = index.join(values.rename(column), how='inner')
+    keys = stations.index if zoom is None else stations[f"z{zoom}"]
+
+    clusters = stations.groupby(keys, sort=False).agg(**{
+        'Latitude': ('Latitude', 'mean'),
+        'Longitude': ('Longitude', 'mean'),
+        'Stations': ('Latitude', 'size'),
+        column: (column, 'sum'),
+    })
+    # The highest-demand station names the cluster, e.g. "Station 012 + 3 more"
+    clusters['Station'] = stations[column].groupby(keys, sort=False).idxmax()
+    more = clusters['Stations'] > 1
+    clusters.loc[more, 'Station'] += " + " + (clusters.loc[more, 'Stations'] - 1).astype(str) + " more"
+    return clusters.reset_index(drop=True)
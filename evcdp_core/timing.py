@@ -0,0 +1,56 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("evcdp.timing")
+if os.environ.get("EVCDP_TIMING_LOG"):
+    _handler = logging.FileHandler(os.environ["EVCDP_TIMING_LOG"])
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+# Streamlit runs every session in its own thread, so each run keeps its own records
+_run = threading.local()
+# Page modules are imported once per process; their cold import cost is kept here
+import_times = {}
+
+
+# Start a new timing report for one page render
+def start_run(page):
+    _run.page = page
+    _run.records = []
+
+
+# Time a stage of the current page render (import, data load, model load, render, ...)
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        page = getattr(_run, "page", None)
+        if hasattr(_run, "records"):
+            _run.records.append({"Page": page, "Stage": stage, "Seconds": seconds})
+        logger.info("page=%s stage=%s seconds=%.4f", page, stage, seconds)
+
+
+# Import a module, remembering how long its first import took
+def timed_import(name):
+    import importlib
+    import sys
+
+    cold = name not in sys.modules
+    with timed("import"):
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+    if cold:
+        import_times[name] = time.perf_counter() - start
+    return module
+
+
+# Return the stages recorded for the current page render
+def run_records():
+    return list(getattr(_run, "records", []))
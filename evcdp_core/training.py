@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from evcdp_core.forecast import GRANULARITIES, WINDOW_DAYS, group_stations, prepare_daily
+from evcdp_core.ingest import CHUNK_SIZE, FREQUENCIES, aggregate_daily_chunked
+from evcdp_core.scaler import fit_scaler, save_scaler, scaler_path
+
+N_STATIONS = 14
+VALIDATION_SPLIT = 0.15
+TEST_SPLIT = 0.15
+
+
+def build_lstm(input_shape, units=(64, 32), dropout=0.2):
+    from keras import Sequential, layers
+
+    return Sequential([
+        layers.Input(input_shape),
+        layers.LSTM(units[0], return_sequences=True),
+        layers.Dropout(dropout),
+        layers.LSTM(units[1]),
+        layers.Dropout(dropout),
+        layers.Dense(input_shape[-1]),
+    ])
+
+
+def build_gru(input_shape, units=(64, 32), dropout=0.2):
+    from keras import Sequential, layers
+
+    return Sequential([
+        layers.Input(input_shape),
+        layers.GRU(units[0], return_sequences=True),
+        layers.Dropout(dropout),
+        layers.GRU(units[1]),
+        layers.Dropout(dropout),
+        layers.Dense(input_shape[-1]),
+    ])
+
+
+def build_cnnlstm(input_shape, units=(64, 32), dropout=0.2, filters=64, kernel_size=3, pool_size=2):
+    from keras import Sequential, layers
+
+    return Sequential([
+        layers.Input(input_shape),
+        layers.Conv1D(filters, kernel_size, activation="relu"),
+        layers.MaxPooling1D(pool_size),
+        layers.LSTM(units[0], return_sequences=True),
+        layers.Dropout(dropout),
+        layers.LSTM(units[1]),
+        layers.Dropout(dropout),
+        layers.Dense(input_shape[-1]),
+    ])
+
+
+ARCHITECTURES = {
+    "lstm": build_lstm,
+    "gru": build_gru,
+    "cnnlstm": build_cnnlstm,
+}
+
+
+# Normalized (station groups, periods, stations per group) series from a training session log
+def load_series(source, chunksize=None, width=N_STATIONS, granularity="daily"):
+    daily = aggregate_daily_chunked(source, chunksize or CHUNK_SIZE, freq=FREQUENCIES[granularity])
+    scaler = fit_scaler(daily)
+
+    _, temporal_data, _ = prepare_daily(daily, scaler, granularity)
+    return group_stations(temporal_data.to_numpy(dtype=np.float32), width), scaler
+
+
+# Chronological train/validation/test split of window start periods
+def split_windows(n_days, validation_split=VALIDATION_SPLIT, test_split=TEST_SPLIT, window=WINDOW_DAYS):
+    starts = np.arange(n_days - window)
+    test_start = int(len(starts) * (1 - test_split))
+    validation_start = int(len(starts) * (1 - test_split - validation_split))
+    return starts[:validation_start], starts[validation_start:test_start], starts[test_start:]
+
+
+# Stream (window, next period) pairs; only window indices are held, never the windows themselves
+def window_dataset(series, starts, batch_size=32, shuffle=False, seed=0, window=WINDOW_DAYS):
+    import tensorflow as tf
+
+    series = tf.constant(series)
+    n_groups = series.shape[0]
+
+    # Every (station group, start day) pair is one sample
+    samples = np.stack(np.meshgrid(np.arange(n_groups), starts, indexing="ij"), axis=-1).reshape(-1, 2)
+    dataset = tf.data.Dataset.from_tensor_slices(samples.astype(np.int32))
+    if shuffle:
+        dataset = dataset.shuffle(len(samples), seed=seed, reshuffle_each_iteration=True)
+
+    offsets = tf.range(window + 1)
+
+    # Gather a whole batch of windows at once
+    def gather(batch):
+        days = batch[:, 1:2] + offsets
+        groups = tf.repeat(batch[:, 0:1], window + 1, axis=1)
+        windows = tf.gather_nd(series, tf.stack([groups, days], axis=-1))
+        return windows[:, :window], windows[:, window]
+
+    return (
+        dataset.batch(batch_size)
+        .map(gather, num_parallel_calls=tf.data.AUTOTUNE)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+
+
+# Build one architecture and compile it with the MSE loss and the RMSE / MAE metrics
+def compile_model(architecture, input_shape, learning_rate=1e-3, **config):
+    import keras
+
+    model = ARCHITECTURES[architecture](input_shape, **config)
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate),
+        loss="mse",
+        metrics=[keras.metrics.RootMeanSquaredError(name="rmse"), keras.metrics.MeanAbsoluteError(name="mae")],
+    )
+    return model
+
+
+# Build, train and evaluate one architecture
+def train_model(architecture, series, splits, epochs=50, batch_size=32, patience=5, learning_rate=1e-3,
+                granularity="daily", **config):
+    import keras
+
+    window = GRANULARITIES[granularity]["window"]
+    train_starts, validation_starts, test_starts = splits
+    model = compile_model(architecture, (window, series.shape[-1]), learning_rate, **config)
+
+    train = window_dataset(series, train_starts, batch_size, shuffle=True, window=window)
+    validation = window_dataset(series, validation_starts, batch_size, window=window)
+    start = time.perf_counter()
+    history = model.fit(
+        train,
+        validation_data=validation,
+        epochs=epochs,
+        callbacks=[keras.callbacks.EarlyStopping(patience=patience, restore_best_weights=True)],
+        verbose=2,
+    )
+    train_seconds = time.perf_counter() - start
+
+    metrics = {}
+    for name, starts in (("Training", train_starts), ("Testing", test_starts)):
+        mse, rmse, mae = model.evaluate(window_dataset(series, starts, batch_size, window=window), verbose=0)
+        metrics[name] = {"MSE": mse, "RMSE": rmse, "MAE": mae}
+
+    return model, {
+        "architecture": architecture,
+        "granularity": granularity,
+        "config": {"epochs": epochs, "batch_size": batch_size, "patience": patience,
+                   "learning_rate": learning_rate, **config},
+        "epochs_trained": len(history.history["loss"]),
+        "train_seconds": train_seconds,
+        "metrics": metrics,
+        "history": {key: [float(value) for value in values] for key, values in history.history.items()},
+    }
+
+
+# Where a run exports its model, e.g. gru_ev_model.h5 or cnnlstm_ev_model_hourly.h5
+def export_path(architecture, granularity="daily", out_dir="."):
+    suffix = "" if granularity == "daily" else f"_{granularity}"
+    return os.path.join(out_dir, f"{architecture}_ev_model{suffix}.h5")
+
+
+# Model, scaler and metrics are written side by side, e.g. gru_ev_model.h5 / .scaler.json / .metrics.json
+def export_run(model, scaler, report, out_dir="."):
+    os.makedirs(out_dir, exist_ok=True)
+    model_path = export_path(report["architecture"], report.get("granularity", "daily"), out_dir)
+    model.save(model_path)
+    save_scaler(scaler, scaler_path(model_path))
+    with open(os.path.splitext(model_path)[0] + ".metrics.json", "w") as f:
+        json.dump(report, f, indent=2)
+    return model_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Train the LSTM, GRU and CNN-LSTM demand models on a session log."
+    )
+    parser.add_argument("sessions", help="Training session CSV")
+    parser.add_argument("--arch", nargs="+", choices=sorted(ARCHITECTURES), default=sorted(ARCHITECTURES),
+                        help="Architectures to train")
+    parser.add_argument("--epochs", type=int, default=50, help="Maximum number of epochs")
+    parser.add_argument("--batch-size", type=int, default=32, help="Windows per batch")
+    parser.add_argument("--patience", type=int, default=5, help="Early-stopping patience in epochs")
+    parser.add_argument("--granularity", choices=sorted(GRANULARITIES), default="daily",
+                        help="Train on daily (7-day windows) or hourly (168-hour windows) series")
+    parser.add_argument("--out-dir", default=".", help="Directory to export models, scalers and metrics to")
+    parser.add_argument("--chunksize", type=int, help="Read the session log in chunks of this many rows")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads for TensorFlow (0 = all cores)")
+    parser.add_argument("--force", action="store_true",
+                        help="Overwrite existing models, e.g. the shipped one the Prediction page serves")
+    args = parser.parse_args(argv)
+
+    # Checked before training, so a long run never ends by replacing a served model by accident
+    paths = [export_path(architecture, args.granularity, args.out_dir) for architecture in args.arch]
+    existing = [path for path in paths if os.path.exists(path)]
+    if existing and not args.force:
+        print(f"Not overwriting {', '.join(existing)}; pass --force to replace them, or choose another --out-dir.")
+        return 1
+
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(args.threads)
+    tf.config.threading.set_inter_op_parallelism_threads(args.threads)
+
+    series, scaler = load_series(args.sessions, args.chunksize, granularity=args.granularity)
+    splits = split_windows(series.shape[1], window=GRANULARITIES[args.granularity]["window"])
+    print(f"{series.shape[0]} station groups x {series.shape[1]} {GRANULARITIES[args.granularity]['unit']}; "
+          f"{series.shape[0] * len(splits[0])} training windows")
+
+    for architecture in args.arch:
+        model, report = train_model(architecture, series, splits, args.epochs, args.batch_size, args.patience,
+                                    granularity=args.granularity)
+        model_path = export_run(model, scaler, report, args.out_dir)
+        testing = report["metrics"]["Testing"]
+        print(f"{architecture}: test MSE {testing['MSE']:.6f} RMSE {testing['RMSE']:.5f} "
+              f"MAE {testing['MAE']:.5f} in {report['train_seconds']:.1f}s -> {model_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,68 +1,196 @@
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-import matplotlib.pyplot as plt
+
+from evcdp_core.charts import figure_from_json, figure_json, figure_png, line_figure
+from evcdp_core.datacache import load_cached
+from evcdp_core.schema import SchemaError, read_csv, validate
+from evcdp_core.timing import timed
+
+DATA_FILE = "synthetic_ev_session_highways_my.csv"
+# Bump when parse_data() changes so stale on-disk caches are not reused
+CACHE_VERSION = 5
+WEEKDAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTH_ORDER = [
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+]
+
+# Parse the session CSV with explicit types, validate it and derive the calendar columns
+def parse_data(data_file):
+    data = validate(read_csv(data_file))
+    data['Station'] = data['Station'].astype('category')
+    data['Day'] = data['Timestamp'].dt.normalize()  # Add 'Day' column
+    data['Year'] = data['Timestamp'].dt.year.astype('int16')
+    data['Month'] = data['Timestamp'].dt.month.astype('int8')
+    data['DayOfMonth'] = data['Timestamp'].dt.day.astype('int8')
+    data['Hour'] = data['Timestamp'].dt.hour.astype('int8')
+    # Weekday names as an ordered categorical (0 = Monday, 6 = Sunday)
+    data['Weekday'] = pd.Categorical.from_codes(
+        data['Timestamp'].dt.weekday, categories=WEEKDAY_ORDER, ordered=True
+    )
+    return data
 
 # Function to load data
-@st.cache_data
+# A resource, not data: st.cache_data would hand every caller a private copy of the mapped frame
+@st.cache_resource
 def load_data():
-    data_file = "synthetic_ev_session_highways_my.csv" 
-    data = pd.read_csv(data_file)
-    data['Timestamp'] = pd.to_datetime(data['Timestamp'])
-    data['Day'] = data['Timestamp'].dt.date  # Add 'Day' column
-    data['Year'] = data['Timestamp'].dt.year
-    data['Month'] = data['Timestamp'].dt.month
-    data['DayOfMonth'] = data['Timestamp'].dt.day
-    data['Hour'] = data['Timestamp'].dt.hour
-    data['Weekday'] = data['Timestamp'].dt.weekday  # 0 = Monday, 6 = Sunday
-    # Map numeric weekday values to their corresponding names
-    weekday_map = {0: "Monday", 1: "Tuesday", 2: "Wednesday", 3: "Thursday", 4: "Friday", 5: "Saturday", 6: "Sunday"}
-    data['Weekday'] = data['Weekday'].map(weekday_map)
-    return data
+    # Reuse the memory-mapped columnar cache on disk unless the CSV has changed
+    return load_cached(DATA_FILE, parse_data, name=f"parsed-v{CACHE_VERSION}", memory_map=True)
+
+# Slice rows whose sorted date column falls between the selected dates
+def slice_dates(frame, column, start_date, end_date):
+    dates = frame[column].values
+    start = dates.searchsorted(pd.to_datetime(start_date).to_datetime64(), side='left')
+    end = dates.searchsorted(pd.to_datetime(end_date).to_datetime64(), side='right')
+    return frame.iloc[start:end]
 
-# Function to filter data
-def filter_data(data, start_date, end_date):
-    filtered_data = data.copy()
-    
-    # Filter by timestamp
+# Build a daily x station rollup of the sessions that answers every chart
+@st.cache_data
+def load_rollup():
+    data = load_data()
+    rollup = data.groupby(
+        ['Day', 'Station'], observed=True, sort=True
+    ).agg(**{
+        'Energy Delivered (kWh)': ('Energy Delivered (kWh)', 'sum'),
+        'Count': ('Energy Delivered (kWh)', 'size')
+    }).reset_index()
+
+    # Calendar columns are derived per day instead of per session
+    rollup['Day of Month'] = rollup['Day'].dt.day
+    rollup['Weekday'] = pd.Categorical.from_codes(
+        rollup['Day'].dt.weekday, categories=WEEKDAY_ORDER, ordered=True
+    )
+    rollup['Year'] = rollup['Day'].dt.year
+    rollup['Month'] = pd.Categorical.from_codes(
+        rollup['Day'].dt.month - 1, categories=MONTH_ORDER, ordered=True
+    )
+    return rollup
+
+# Function to filter the rollup to whole days between the selected dates
+def filter_rollup(rollup, start_date, end_date):
+    # The rollup is sorted by 'Day'
     if start_date and end_date:
-        filtered_data = filtered_data[
-            (filtered_data['Timestamp'] >= pd.to_datetime(start_date)) & 
-            (filtered_data['Timestamp'] <= pd.to_datetime(end_date))
-        ]
-    return filtered_data
+        return slice_dates(rollup, 'Day', start_date, end_date)
+    return rollup
+
+# Total energy per day over the selected range; long ranges are downsampled for the browser
+def series_figure(filtered_data):
+    series = filtered_data.groupby('Day', sort=True)['Energy Delivered (kWh)'].sum().reset_index()
+    return line_figure(
+        series,
+        'Day',
+        'Energy Delivered (kWh)',
+        title="Energy Delivered over Time",
+        labels={'Day': 'Date'}
+    )
+
+def day_figure(filtered_data):
+    daily_energy = filtered_data.groupby('Day of Month')['Energy Delivered (kWh)'].sum().reset_index()
+    return line_figure(
+        daily_energy,
+        'Day of Month',
+        'Energy Delivered (kWh)',
+        title="Energy Delivered by Day",
+        labels={'Day of Month': 'Day of the Month'}
+    )
+
+def weekday_figure(filtered_data):
+    weekday_energy = filtered_data.groupby('Weekday', observed=False)['Energy Delivered (kWh)'].sum().reset_index()
+    return px.bar(
+        weekday_energy,
+        x='Weekday',
+        y='Energy Delivered (kWh)',
+        title="Energy Delivered by Weekday",
+        labels={'Energy Delivered (kWh)': 'Total Energy Delivered (kWh)', 'Weekday': 'Day of the Week'}
+    )
+
+def station_figure(filtered_data):
+    station_energy = filtered_data.groupby('Station', observed=True)['Energy Delivered (kWh)'].sum().reset_index()
+    station_energy = station_energy.sort_values(by='Energy Delivered (kWh)', ascending=True)
+    return px.bar(
+        station_energy,
+        x='Energy Delivered (kWh)',
+        y='Station',
+        title="Energy Delivered by Charging Station",
+        labels={'Energy Delivered (kWh)': 'Total Energy Delivered (kWh)', 'Station': 'Charging Station'},
+        orientation='h'
+    )
+
+CHARTS = {
+    "series": series_figure,
+    "day": day_figure,
+    "weekday": weekday_figure,
+    "station": station_figure,
+}
+
+# Serialized figure per chart and filter range, so reruns with the same dates skip building it
+@st.cache_data(max_entries=64)
+def chart_json(chart, start_date, end_date):
+    filtered_data = filter_rollup(load_rollup(), start_date, end_date)
+    return figure_json(CHARTS[chart](filtered_data))
+
+def load_chart(chart, start_date, end_date):
+    return figure_from_json(chart_json(chart, start_date, end_date))
+
+# Monthly charging events for 2023 and 2024, rendered to PNG once per filter range
+@st.cache_data(max_entries=16)
+def monthly_events_png(start_date, end_date):
+    filtered_data = filter_rollup(load_rollup(), start_date, end_date)
+    filtered_years = filtered_data[filtered_data['Year'].isin([2023, 2024])]
+
+    monthly_event_counts = (
+        filtered_years.groupby(['Year', 'Month'], observed=True)['Count']
+        .sum()
+        .reset_index()
+    )
+    pivot_data = monthly_event_counts.pivot(index='Month', columns='Year', values='Count').fillna(0)
+
+    # matplotlib is only needed for this chart
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    pivot_data.plot(kind='bar', ax=ax, width=0.8, edgecolor='black')
+    ax.set_title('Monthly Charging Events Count for 2023 and 2024', fontsize=14)
+    ax.set_xlabel('Month', fontsize=12)
+    ax.set_ylabel('Number of Charging Events', fontsize=12)
+    ax.set_xticklabels(
+        ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+        rotation=0,
+        fontsize=10
+    )
+    ax.legend(title='Year', fontsize=12)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    return figure_png(fig)
 
 # EDA Page
 def render():
     st.title("Exploratory Data Analysis (EDA)")
 
-    # Load data
-    data = load_data()
+    # Load the daily rollup
+    with timed("data load"):
+        try:
+            rollup = load_rollup()
+        except SchemaError as error:
+            st.error(f"{DATA_FILE}: {error}")
+            return
 
     # Filters on the main page
     col1, col2 = st.columns(2)
 
     with col1:
-        start_date = st.date_input("Start Date", value=data['Timestamp'].min().date())
+        start_date = st.date_input("Start Date", value=rollup['Day'].min().date())
     with col2:
-        end_date = st.date_input("End Date", value=data['Timestamp'].max().date())
+        end_date = st.date_input("End Date", value=rollup['Day'].max().date())
+
+    # Energy Delivered over the selected range, one point per day
+    st.plotly_chart(load_chart("series", start_date, end_date), use_container_width=True)
 
-    # Filter data based on selected dates
-    filtered_data = filter_data(data, start_date, end_date)
+    st.markdown("---")
 
     # Sum of Energy Delivered by Day
     #st.subheader("Total Energy Delivered by Day")
-    filtered_data['Day of Month'] = filtered_data['Timestamp'].dt.day  # Extract day of the month (1 to 31)
-    daily_energy = filtered_data.groupby('Day of Month')['Energy Delivered (kWh)'].sum().reset_index()
-
-    fig_daily_energy = px.line(
-        daily_energy,
-        x='Day of Month',
-        y='Energy Delivered (kWh)',
-        title="Energy Delivered by Day",
-        labels={'Day of Month': 'Day of the Month'}
-    )
-    st.plotly_chart(fig_daily_energy, use_container_width=True)
+    st.plotly_chart(load_chart("day", start_date, end_date), use_container_width=True)
 
     # Insight for daily energy
     st.markdown(
@@ -73,18 +201,7 @@ def render():
 
     # Sum of Energy Delivered by Weekday
     #st.subheader("Total Energy Delivered by Weekday")
-    weekday_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    filtered_data['Weekday'] = pd.Categorical(filtered_data['Weekday'], categories=weekday_order, ordered=True)
-    weekday_energy = filtered_data.groupby('Weekday')['Energy Delivered (kWh)'].sum().reset_index()
-
-    fig_weekday_energy = px.bar(
-        weekday_energy,
-        x='Weekday',
-        y='Energy Delivered (kWh)',
-        title="Energy Delivered by Weekday",
-        labels={'Energy Delivered (kWh)': 'Total Energy Delivered (kWh)', 'Weekday': 'Day of the Week'}
-    )
-    st.plotly_chart(fig_weekday_energy, use_container_width=True)
+    st.plotly_chart(load_chart("weekday", start_date, end_date), use_container_width=True)
 
     # Insight for weekday energy
     st.markdown(
@@ -95,18 +212,7 @@ def render():
 
     # Sum of Energy Delivered by Charging Station
     #st.subheader("Sum of Energy Delivered by Charging Station")
-    station_energy = filtered_data.groupby('Station')['Energy Delivered (kWh)'].sum().reset_index()
-    station_energy = station_energy.sort_values(by='Energy Delivered (kWh)', ascending=True)
-
-    fig_station_energy = px.bar(
-        station_energy,
-        x='Energy Delivered (kWh)',
-        y='Station',
-        title="Energy Delivered by Charging Station",
-        labels={'Energy Delivered (kWh)': 'Total Energy Delivered (kWh)', 'Station': 'Charging Station'},
-        orientation='h'
-    )
-    st.plotly_chart(fig_station_energy, use_container_width=True)
+    st.plotly_chart(load_chart("station", start_date, end_date), use_container_width=True)
 
     # Insight for charging station energy
     st.markdown(
@@ -117,37 +223,7 @@ def render():
 
     # Monthly Charging Events Count
     #st.subheader("Monthly Charging Events Count for 2023 and 2024")
-    filtered_data['Year'] = filtered_data['Timestamp'].dt.year
-    filtered_data['Month'] = filtered_data['Timestamp'].dt.month_name()
-    filtered_years = filtered_data[filtered_data['Year'].isin([2023, 2024])]
-
-    monthly_event_counts = (
-        filtered_years.groupby(['Year', 'Month'])
-        .size()
-        .reset_index(name='Count')
-    )
-    month_order = [
-        'January', 'February', 'March', 'April', 'May', 'June',
-        'July', 'August', 'September', 'October', 'November', 'December'
-    ]
-    monthly_event_counts['Month'] = pd.Categorical(
-        monthly_event_counts['Month'], categories=month_order, ordered=True
-    )
-    pivot_data = monthly_event_counts.pivot(index='Month', columns='Year', values='Count').fillna(0)
-
-    fig, ax = plt.subplots(figsize=(12, 6))
-    pivot_data.plot(kind='bar', ax=ax, width=0.8, edgecolor='black')
-    ax.set_title('Monthly Charging Events Count for 2023 and 2024', fontsize=14)
-    ax.set_xlabel('Month', fontsize=12)
-    ax.set_ylabel('Number of Charging Events', fontsize=12)
-    ax.set_xticklabels(
-        ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
-        rotation=0,
-        fontsize=10
-    )
-    ax.legend(title='Year', fontsize=12)
-    ax.grid(axis='y', linestyle='--', alpha=0.7)
-    st.pyplot(fig)
+    st.image(monthly_events_png(start_date, end_date), use_column_width=True)
 
     # Insight for monthly charging events
     st.markdown(
@@ -1,138 +1,178 @@
+import hashlib
+import io
+import json
+import os
+
 import streamlit as st
 import pandas as pd
-from PIL import Image
+import plotly.express as px
+
+from evcdp_core.evaluation import METRIC_UNITS, MODEL_FILES, available_models, evaluate, models_digest
+from evcdp_core.datacache import file_digest, source_key
+from evcdp_core.timing import timed
+from evcdp_pages.eda import DATA_FILE
+
+# Pre-rendered training plots, shown when a model has no exported training history
+LOSS_IMAGES = {
+    "LSTM": 'loss_graph_lstm_final.jpg',
+    "CNN-LSTM": 'cnnlstm_loss_graph_final.jpg',
+    "GRU": 'gru_loss_graph.jpg',
+}
+# Actual vs predicted plots from the original training run, kept for models that are not trained here yet
+LEGACY_PREDICTION_IMAGES = {
+    "LSTM": 'lstm_actvspred_final.jpg',
+    "CNN-LSTM": 'cnnlstm_actvspred_final.jpg',
+    "GRU": 'gru_actvspred.jpg',
+}
+
+# Backtest results per dataset and model version; the on-disk JSON cache survives restarts
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_evaluation(dataset_digest, model_version, _source):
+    return evaluate(_source, dataset_digest=dataset_digest)
+
+# Content hash of the bundled dataset, recomputed only when the file changes
+@st.cache_data
+def load_dataset_version(path, key):
+    return file_digest(path)
+
+# Training history exported next to a model by the training pipeline
+@st.cache_data
+def load_history(model_path, model_version):
+    metrics_path = os.path.splitext(model_path)[0] + ".metrics.json"
+    if not os.path.exists(metrics_path):
+        return None
+    with open(metrics_path) as f:
+        return json.load(f).get("history")
+
+
+# A model without an exported file is listed with the command that trains it, and its original plots
+def render_missing(name, path):
+    st.markdown("---")
+    st.markdown(f"### {name} Model")
+    # The training pipeline names its exports <architecture>_ev_model.h5
+    architecture = os.path.basename(path).split("_ev_model")[0]
+    st.info(f"{path} was not found, so the {name} model is not backtested. Train it with:")
+    st.code(f"python -m evcdp_core.training {DATA_FILE} --arch {architecture}", language="bash")
+
+    images = [image for image in (LOSS_IMAGES[name], LEGACY_PREDICTION_IMAGES[name]) if os.path.exists(image)]
+    if images:
+        st.caption("Plots from the original training run:")
+        for col, image in zip(st.columns(2), images):
+            with col:
+                st.image(image, use_column_width=True)
+
 
 def render():
     st.title("🔍 Model Evaluation")
     
     # Introduction section
     st.markdown("""
-    In this analysis, we evaluate three different deep learning models for energy demand prediction:
+    In this analysis, we compare three deep learning architectures for energy demand prediction:
     
     1. **LSTM (Long Short-Term Memory)**: A type of RNN that can learn long-term dependencies
     2. **CNN-LSTM (Convolutional Neural Network + LSTM)**: A hybrid model combining CNN's feature extraction with LSTM's sequential learning capabilities
     3. **GRU (Gated Recurrent Unit)**: A variant of RNN with a simplified gating mechanism
-    
-    Best performing model: **CNN-LSTM hybrid model**
+
+    Every model with a trained file is backtested on the dataset below; models that are not trained yet
+    are listed with the command that trains them.
     """)
     
-    st.markdown("---")
+    # Evaluate on the bundled session log or on an uploaded one
+    uploaded_file = st.file_uploader("Evaluate on your own session CSV (defaults to the bundled dataset)", type=["csv"])
+    if uploaded_file is not None:
+        content = uploaded_file.getvalue()
+        dataset_digest, source = hashlib.sha256(content).hexdigest(), io.BytesIO(content)
+    elif os.path.exists(DATA_FILE):
+        dataset_digest, source = load_dataset_version(DATA_FILE, source_key(DATA_FILE)), DATA_FILE
+    else:
+        st.info(f"Upload a session CSV to evaluate the models; {DATA_FILE} was not found.")
+        return
+
+    models = available_models()
+    missing = {name: path for name, path in MODEL_FILES.items() if name not in models}
+    if not models:
+        st.warning("No model files found: " + ", ".join(MODEL_FILES.values()))
+        for name, path in missing.items():
+            render_missing(name, path)
+        return
+    model_version = models_digest(models)
+
+    try:
+        with timed("evaluate"), st.spinner("Backtesting the models..."):
+            results = load_evaluation(dataset_digest, model_version, source)
+    except ValueError as error:
+        st.warning(str(error))
+        return
+
+    best_model = min(results, key=lambda name: results[name]["overall"]["Testing"]["MSE"])
+    st.markdown(f"Best performing model on this dataset: **{best_model}**")
+
+    for name, result in results.items():
+        st.markdown("---")
+        st.markdown(f"### {name} Model Metrics")
+        metrics_df = pd.DataFrame.from_dict(result["overall"], orient="index").rename_axis("Dataset").reset_index()
+        st.table(metrics_df.rename(columns={metric: f"{metric} ({unit})" for metric, unit in METRIC_UNITS.items()}))
+        # Normalized errors depend on the model's scaler, but match the training metrics
+        normalized = result["overall_normalized"]["Testing"]
+        st.caption("Testing errors in the model's normalized units: "
+                   + ", ".join(f"{metric} {value:.6f}" for metric, value in normalized.items()))
+
+        # Create columns
+        col1, col2 = st.columns(2)
+
+        # Training history from the exported metrics, or the pre-rendered plot
+        with col1:
+            history = load_history(models[name], model_version)
+            if history:
+                loss_df = pd.DataFrame({"Training": history["loss"], "Validation": history.get("val_loss")})
+                fig = px.line(loss_df, labels={"index": "Epoch", "value": "Loss", "variable": ""},
+                              title="Training and Validation Loss")
+                st.plotly_chart(fig, use_container_width=True)
+            elif os.path.exists(LOSS_IMAGES[name]):
+                st.image(LOSS_IMAGES[name], caption='Training and Validation Loss', use_column_width=True)
+
+        # Backtested network demand; the test period is the last part of the series
+        with col2:
+            series_df = pd.DataFrame(result["series"])
+            fig = px.line(series_df, x="Date", y=["Actual", "Predicted"],
+                          labels={"value": "Energy (kWh)", "variable": ""},
+                          title="Actual vs Predicted Energy Demand")
+            test_dates = series_df.loc[series_df["Testing"], "Date"]
+            if not test_dates.empty:
+                fig.add_vrect(x0=test_dates.iloc[0], x1=test_dates.iloc[-1], fillcolor="gray", opacity=0.15,
+                              line_width=0, annotation_text="Testing")
+            st.plotly_chart(fig, use_container_width=True)
+
+        with st.expander("Per-station testing metrics"):
+            st.dataframe(pd.DataFrame(result["per_station"]))
+
+    for name, path in missing.items():
+        render_missing(name, path)
 
-    # Metrics for LSTM
-    lstm_metrics = {
-        "Dataset": ["Training", "Testing"],
-        "MSE": [0.002138, 0.002033],
-        "RMSE": [0.04624, 0.04509],
-        "MAE": [0.02912, 0.02793]
-    }
-    
-    # Metrics for CNN-LSTM
-    cnn_lstm_metrics = {
-        "Dataset": ["Training", "Testing"],
-        "MSE": [0.0010670, 0.001140],
-        "RMSE": [0.03267, 0.03377],
-        "MAE": [0.02003, 0.02086]
-    }
-    
-    # Metrics for GRU
-    gru_metrics = {
-        "Dataset": ["Training", "Testing"],
-        "MSE": [0.002298, 0.002249],
-        "RMSE": [0.04793, 0.04742],
-        "MAE": [0.03102, 0.03018]
-    }
-    
-    # Convert metrics to DataFrames
-    lstm_df = pd.DataFrame(lstm_metrics)
-    cnn_lstm_df = pd.DataFrame(cnn_lstm_metrics)
-    gru_df = pd.DataFrame(gru_metrics)
-    
-    # Display tables
-    st.markdown("### LSTM Model Metrics")
-    st.table(lstm_df)
-    
-    # Add an image
-    # Load images
-    image1 = 'loss_graph_lstm_final.jpg'
-    image2 = 'lstm_actvspred_final.jpg'
-    
-    # Create columns
-    col1, col2 = st.columns(2)
-    
-    # Display images and labels
-    with col1:
-        st.image(image1, caption='Training and Validation Loss', use_column_width=True)
-    with col2:
-        st.image(image2, caption='Actual vs Predicted Energy Demand', use_column_width=True)
-    
-    st.markdown("---")
-    
-    st.markdown("### CNN-LSTM Model Metrics")
-    st.table(cnn_lstm_df)
-    
-    # Load images
-    image1 = 'cnnlstm_loss_graph_final.jpg'
-    image2 = 'cnnlstm_actvspred_final.jpg'
-    
-    # Create columns
-    col3, col4 = st.columns(2)
-    
-    # Display images and labels
-    with col3:
-        st.image(image1, caption='Training and Validation Loss', use_column_width=True)
-    with col4:
-        st.image(image2, caption='Actual vs Predicted Energy Demand', use_column_width=True)
-    
-    st.markdown("---")
-    
-    # Display tables
-    st.markdown("### GRU Model Metrics")
-    st.table(gru_df)
-    
-    # Add an image
-    # Load images
-    image31 = 'gru_loss_graph.jpg'
-    image32 = 'gru_actvspred.jpg'
-    
-    # Create columns
-    col31, col32 = st.columns(2)
-    
-    # Display images and labels
-    with col31:
-        st.image(image31, caption='Training and Validation Loss', use_column_width=True)
-    with col32:
-        st.image(image32, caption='Actual vs Predicted Energy Demand', use_column_width=True)
-    
     st.markdown("---")
-    
+
     # Comparison Table
     st.markdown("### Model Comparison")
-    
-    comparison_data = {
-        "Model": ["LSTM", "CNN-LSTM", "GRU"],
-        "Training MSE": [lstm_metrics["MSE"][0], cnn_lstm_metrics["MSE"][0], gru_metrics["MSE"][0]],
-        "Testing MSE": [lstm_metrics["MSE"][1], cnn_lstm_metrics["MSE"][1], gru_metrics["MSE"][1]],
-        "Training RMSE": [lstm_metrics["RMSE"][0], cnn_lstm_metrics["RMSE"][0], gru_metrics["RMSE"][0]],
-        "Testing RMSE": [lstm_metrics["RMSE"][1], cnn_lstm_metrics["RMSE"][1], gru_metrics["RMSE"][1]],
-        "Training MAE": [lstm_metrics["MAE"][0], cnn_lstm_metrics["MAE"][0], gru_metrics["MAE"][0]],
-        "Testing MAE": [lstm_metrics["MAE"][1], cnn_lstm_metrics["MAE"][1], gru_metrics["MAE"][1]]
-    }
-    
+
+    comparison_data = {"Model": list(results)}
+    for metric in ("MSE", "RMSE", "MAE"):
+        for split in ("Training", "Testing"):
+            comparison_data[f"{split} {metric} ({METRIC_UNITS[metric]})"] = [
+                result["overall"][split][metric] for result in results.values()
+            ]
+
     comparison_df = pd.DataFrame(comparison_data)
-    
-    # Style the dataframe to highlight CNN-LSTM row
-    def highlight_cnn_lstm(row):
-        return ['background-color: #90EE90' if row['Model'] == 'CNN-LSTM' else '' for _ in row]
-    
-    styled_comparison = comparison_df.style.apply(highlight_cnn_lstm, axis=1)
+
+    # Style the dataframe to highlight the best model's row
+    def highlight_best(row):
+        return ['background-color: #90EE90' if row['Model'] == best_model else '' for _ in row]
+
+    styled_comparison = comparison_df.style.apply(highlight_best, axis=1)
     st.dataframe(styled_comparison)
-    
-    # Add conclusion about CNN-LSTM performance
-    st.markdown("""
-    **Key Finding**: The CNN-LSTM hybrid model (highlighted in green) demonstrates superior performance across all metrics:
-    - Lowest MSE values for both training and testing
-    - Lowest RMSE values for both training and testing
-    - Lowest MAE values for both training and testing
-    
-    This indicates that the combination of CNN's feature extraction capabilities with LSTM's sequential learning provides the most accurate energy demand predictions.
-    """)
\ No newline at end of file
+    if missing:
+        st.caption("Not compared, as they are not trained yet: " + ", ".join(missing))
+
+    st.markdown(f"""
+    **Key Finding**: The {best_model} model (highlighted in green) has the lowest testing MSE in kWh in a walk-forward
+    backtest over {len(next(iter(results.values()))["series"]["Date"])} days, predicting each day from the 7 days before it.
+    """)
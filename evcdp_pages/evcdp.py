@@ -1,118 +1,263 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from keras.models import load_model
-from keras.metrics import MeanSquaredError
-import tensorflow as tf
 import plotly.express as px
 import plotly.graph_objects as go
 
-# Load your pre-trained LSTM model
+from evcdp_core.batching import MicroBatcher
+from evcdp_core.datacache import file_digest
+from evcdp_core.ensemble import ensemble_members, forecast_ensemble
+from evcdp_core.evaluation import MODEL_FILES, rolling_windows
+from evcdp_core.forecast import (
+    BACKEND,
+    GRANULARITIES,
+    MODEL_PATH,
+    WINDOW_DAYS,
+    denormalize,
+    forecast_horizon,
+    horizon_dates,
+    load_forecast_model,
+    prepare_daily,
+)
+from evcdp_core.incremental import STATE_PATH, prepare_state, update_state
+from evcdp_core.ingest import FREQUENCIES, aggregate_daily_chunked
+from evcdp_core.quantize import accuracy_delta, available_backends, backend_path
+from evcdp_core.scaler import load_scaler, scaler_path
+from evcdp_core.schema import SchemaError
+from evcdp_core.spatial import auto_zoom, build_index, cluster
+from evcdp_core.timing import timed
+
+# Cached predictions per upload; bounded in size and age across all sessions
+PREDICTION_CACHE_ENTRIES = 64
+PREDICTION_CACHE_TTL = 60 * 60  # seconds
+# Windows of the upload used to compare a reduced-precision backend with the original model
+ACCURACY_WINDOWS = 512
+# Rows per page of the station table, and stations drawn in the per-station charts
+TABLE_PAGE_SIZE = 50
+TOP_STATIONS = 25
+# Points drawn on the map at most with "Auto" detail, and the tile zoom each coarser detail clusters at
+MAP_POINTS = 500
+MAP_DETAIL = {"Auto": None, "Coarse": 8, "Medium": 10, "Fine": 12, "Stations": None}
+
+# Load your pre-trained LSTM model together with its training-time scaler
+@st.cache_resource
+def load_best_model(backend=BACKEND, model_path=MODEL_PATH):
+    return load_forecast_model(model_path, backend), load_scaler(model_path)
+
+# Prediction service shared by all sessions; concurrent requests are micro-batched
+@st.cache_resource
+def load_prediction_service(backend=BACKEND, model_path=MODEL_PATH):
+    best_model, _ = load_best_model(backend, model_path)
+    return MicroBatcher(best_model)
+
+# Version of the model and scaler files, used to key cached predictions
+@st.cache_resource
+def load_model_version(backend=BACKEND, model_path=MODEL_PATH):
+    return file_digest(backend_path(model_path, backend), scaler_path(model_path))
+
+# Aggregate, scale and forecast an upload; keyed by its content hash, not its bytes
+@st.cache_data(max_entries=PREDICTION_CACHE_ENTRIES, ttl=PREDICTION_CACHE_TTL, show_spinner=False)
+def predict_upload(upload_digest, model_version, horizon, backend, granularity, _upload):
+    model_path, window = GRANULARITIES[granularity]["model"], GRANULARITIES[granularity]["window"]
+    _, saved_scaler = load_best_model(backend, model_path)
+    
+    # Load and aggregate the data in chunks to keep memory bounded
+    ev_session_df = aggregate_daily_chunked(io.BytesIO(_upload), freq=FREQUENCIES[granularity])
+    
+    # Normalize and pivot the data for time series
+    ev_session_df, temporal_data, scaler = prepare_daily(ev_session_df, saved_scaler, granularity)
+    
+    # Ensure data has enough history
+    if len(temporal_data) < window:
+        return ev_session_df, temporal_data, None
+    
+    # Make predictions for every period of the horizon from the past 7 days
+    last_7_days = temporal_data.tail(window).values
+    predicted_normalized = forecast_horizon(load_prediction_service(backend, model_path), [last_7_days], horizon)[0]
+    
+    # Denormalize predictions; the first row is the next period
+    return ev_session_df, temporal_data, denormalize(predicted_normalized, scaler)
+
+# Threads that run the ensemble members side by side, shared by all sessions
 @st.cache_resource
-def load_best_model():
-    # Explicitly map the 'mse' loss function
-    return load_model("cnnlstm_ev_model.h5", custom_objects={"mse": MeanSquaredError()})
+def load_ensemble_executor():
+    return ThreadPoolExecutor(max_workers=len(MODEL_FILES), thread_name_prefix="evcdp-ensemble")
+
+# Aggregate an upload once and forecast it with every trained model concurrently
+@st.cache_data(max_entries=PREDICTION_CACHE_ENTRIES, ttl=PREDICTION_CACHE_TTL, show_spinner=False)
+def predict_ensemble_upload(upload_digest, models_version, horizon, backend, _upload):
+    # Members reuse the cached models and micro-batched services of the single-model mode
+    registry = {
+        name: (load_prediction_service(backend, path), load_best_model(backend, path)[1])
+        for name, path in ensemble_members(backend).items()
+    }
+    ev_session_df = aggregate_daily_chunked(io.BytesIO(_upload))
+    return forecast_ensemble(registry, ev_session_df, horizon, load_ensemble_executor())
+
+# Spatial index over the station coordinates, built once per dataset
+@st.cache_data(max_entries=PREDICTION_CACHE_ENTRIES, ttl=PREDICTION_CACHE_TTL, show_spinner=False)
+def load_station_index(dataset_key, _ev_session_df):
+    return build_index(_ev_session_df)
+
+# Version of the stations and their coordinates, for data that changes without a new upload
+def stations_digest(ev_session_df):
+    stations = ev_session_df[['Station', 'Latitude', 'Longitude']].drop_duplicates('Station')
+    return hashlib.sha256(pd.util.hash_pandas_object(stations, index=False).to_numpy().tobytes()).hexdigest()
+
+# Fold a delta upload into the saved 7-day state and forecast from it
+def predict_daily_update(upload, horizon, backend):
+    _, saved_scaler = load_best_model(backend)
+    
+    # Only the new sessions are aggregated; the same upload is never applied twice, and concurrent
+    # sessions update the shared state one at a time
+    state, _ = update_state([upload], STATE_PATH)
+    
+    ev_session_df, temporal_data, scaler = prepare_state(state, saved_scaler)
+    if len(temporal_data) < WINDOW_DAYS:
+        return ev_session_df, temporal_data, None
+    
+    predicted_normalized = forecast_horizon(load_prediction_service(backend), [temporal_data.values], horizon)[0]
+    return ev_session_df, temporal_data, denormalize(predicted_normalized, scaler)
 
 # Main function for the EVCDP page
 def render():
     st.title("🔋 EV Charging Demand Prediction")
     
+    # Full history, or only the newest sessions appended to the saved daily state
+    input_mode = st.radio("Input", ["Full history", "Daily update"], horizontal=True)
+    
     # Upload CSV file
-    uploaded_file = st.file_uploader("Upload Historical Charging Session CSV", type=["csv"])
+    if input_mode == "Full history":
+        uploaded_file = st.file_uploader("Upload Historical Charging Session CSV", type=["csv"])
+    else:
+        uploaded_file = st.file_uploader("Upload New Charging Sessions CSV", type=["csv"])
+    
+    # Hourly forecasts run on the full history only; the saved state is daily
+    granularity = "daily"
+    if input_mode == "Full history":
+        granularity = st.radio("Granularity", list(GRANULARITIES), format_func=str.capitalize, horizontal=True)
+    model_path = GRANULARITIES[granularity]["model"]
+    if not os.path.exists(model_path):
+        st.warning(f"No {granularity} model found at {model_path}. Train one with "
+                   f"`python -m evcdp_core.training sessions.csv --granularity {granularity}`.")
+        return
+    
+    # Number of days to roll the model forward; hourly forecasts take 24 steps per day
+    horizon = st.slider("Forecast Horizon (days)", min_value=1, max_value=30 if granularity == "daily" else 7, value=1)
+    steps = horizon * GRANULARITIES[granularity]["steps_per_day"]
+    
+    # Full-precision runtimes, plus any reduced-precision exports next to the model; those are only
+    # offered with a standalone TFLite runtime, so the page never pulls in TensorFlow to run them
+    backends = available_backends(model_path, tensorflow_fallback=False)
+    backend = st.selectbox("Inference backend", backends,
+                           index=backends.index(BACKEND) if BACKEND in backends else 0)
+    
+    # Daily forecasts from the full history can average every trained model
+    members = ensemble_members(backend) if input_mode == "Full history" and granularity == "daily" else {}
+    use_ensemble = len(members) > 1 and st.checkbox(
+        f"Ensemble of {', '.join(members)}",
+        help="Average the forecasts of every trained model; their spread is shown as an uncertainty band."
+    )
     
     if uploaded_file is not None:
-        # Load the data
-        ev_session_df = pd.read_csv(uploaded_file)
-        
-        # Preprocess the data
-        #st.write("### Data Preprocessing")
-        ev_session_df['Timestamp'] = pd.to_datetime(ev_session_df['Timestamp'])
-        ev_session_df = ev_session_df.sort_values(by='Timestamp')
-        
-        # Aggregate the data
-        ev_session_df = ev_session_df.set_index('Timestamp').groupby(
-            ['Station', pd.Grouper(freq='D')]
-        ).agg({
-            'Energy Delivered (kWh)': 'sum',
-            'Duration (mins)': 'sum',
-            'Latitude': 'first',
-            'Longitude': 'first'
-        }).reset_index()
-        
-        # st.write("Aggregated Data:")
-        # st.dataframe(ev_session_df)
-        
-        # Normalize the data
-        scaler = MinMaxScaler()
-        ev_session_df[['Duration (mins)', 'Energy Delivered (kWh)']] = scaler.fit_transform(
-            ev_session_df[['Duration (mins)', 'Energy Delivered (kWh)']]
-        )
-        
-        # Pivot the data for time series
-        temporal_data = ev_session_df.pivot(
-            index='Timestamp',
-            columns='Station',
-            values='Energy Delivered (kWh)'
-        ).fillna(0)
-        
-        # # Display pivoted data
-        # st.write("Pivoted Time-Series Data:")
-        # st.dataframe(temporal_data)
-        
-        # Ensure data has enough historical days
-        if len(temporal_data) < 7:
-            st.warning("Not enough historical data for the last 7 days.")
-            return
-        
-        # Extract the past 7 days
-        last_7_days = temporal_data.tail(7).values
-        input_data = last_7_days.reshape(1, 7, last_7_days.shape[1])
-        
         # Load the best model
-        best_model = load_best_model()
+        with timed("model load"):
+            _, saved_scaler = load_best_model(backend, model_path)
+            model_version = load_model_version(backend, model_path)
+            if use_ensemble:
+                model_version = "+".join(load_model_version(backend, path) for path in members.values())
         
-        # Make predictions
-        predicted_normalized = best_model.predict(input_data)[0]
+        with timed("predict"):
+            upload = uploaded_file.getvalue()
+            upload_digest = hashlib.sha256(upload).hexdigest()
+            member_values = {}
+            # Uploads are validated before aggregation; a bad file stops here with the reason
+            try:
+                if use_ensemble:
+                    # The members run side by side, so this takes about as long as the slowest one
+                    result = predict_ensemble_upload(upload_digest, model_version, steps, backend, _upload=upload)
+                    ev_session_df, temporal_data, horizon_values = result["daily"], result["temporal_data"], result["mean"]
+                    member_values = result["members"]
+                elif input_mode == "Full history":
+                    # Identical uploads are answered from the prediction cache
+                    ev_session_df, temporal_data, horizon_values = predict_upload(
+                        upload_digest, model_version, steps, backend, granularity, _upload=upload
+                    )
+                else:
+                    ev_session_df, temporal_data, horizon_values = predict_daily_update(upload, horizon, backend)
+            except SchemaError as error:
+                st.error(str(error))
+                return
         
-        # Denormalize predictions
-        energy_min = scaler.data_min_[1]  # 'Energy Delivered (kWh)' min
-        energy_max = scaler.data_max_[1]  # 'Energy Delivered (kWh)' max
-        predicted_values = predicted_normalized * (energy_max - energy_min) + energy_min
+        if saved_scaler is None:
+            st.caption("No saved scaler found for the model; scaling with the uploaded data's range.")
         
-        # Map station names to predicted values
-        station_names = temporal_data.columns
-        predicted_energy = dict(zip(station_names, predicted_values))
+        if horizon_values is None:
+            if input_mode == "Full history":
+                st.warning(f"Not enough historical data for the last {GRANULARITIES[granularity]['window']} "
+                           f"{GRANULARITIES[granularity]['unit']}.")
+            else:
+                st.warning("The saved daily state does not cover 7 days yet. Keep adding daily updates, "
+                           "or build it from the full history with `python -m evcdp_core.incremental init`.")
+            return
         
-        # Create prediction dataframe
-        prediction_df = pd.DataFrame(list(predicted_energy.items()), 
-                                   columns=["Station", "Predicted Energy (kWh)"])
-        prediction_df = prediction_df.sort_values(by="Predicted Energy (kWh)", ascending=False)
-
-        prediction_df_2dp = prediction_df.copy()
+        if backend.startswith("tflite-"):
+            # Compare the reduced-precision model with the original on this upload's windows
+            with st.expander("Accuracy vs the full-precision model"):
+                best_model, _ = load_best_model(backend, model_path)
+                reference_model, _ = load_best_model("numpy", model_path)
+                window, width = best_model.input_shape[1:]
+                recent = temporal_data.values[-(ACCURACY_WINDOWS + window - 1):]
+                windows = rolling_windows(recent, width, window).reshape(-1, window, width)
+                delta = accuracy_delta(reference_model, best_model, windows[-ACCURACY_WINDOWS:])
+                st.table(pd.DataFrame([delta], index=[backend]))
+                st.caption("Differences are in normalized units (0 to 1 over the training range); "
+                           "times are for one batched predict over the same windows.")
         
-        # Format the predicted energy to 2 decimal places
-        prediction_df_2dp["Predicted Energy (kWh)"] = prediction_df_2dp["Predicted Energy (kWh)"].apply(lambda x: f"{x:.2f}")
+        predicted_values = horizon_values[0]
         
-        # Reset the index and drop it to avoid displaying the index
-        prediction_df_2dp = prediction_df_2dp.reset_index(drop=True)
+        # Create prediction dataframe straight from the arrays, highest demand first
+        station_names = temporal_data.columns
+        order = np.argsort(-predicted_values, kind="stable")
+        prediction_df = pd.DataFrame({
+            "Station": station_names[order],
+            "Predicted Energy (kWh)": predicted_values[order]
+        }, index=pd.RangeIndex(1, len(order) + 1, name="Rank"))
+        if member_values:
+            # Standard deviation across the ensemble members
+            prediction_df["Spread (kWh)"] = result["std"][0][order]
 
-        # Display numerical predictions
-        st.write("### Energy Predicted for Each Station on the Next Day")
-        st.table(prediction_df_2dp)
+        # Display numerical predictions, one page at a time so the page cost does not grow with stations
+        st.write(f"### Energy Predicted for Each Station {'on the Next Day' if granularity == 'daily' else 'in the Next Hour'}")
+        n_pages = -(-len(prediction_df) // TABLE_PAGE_SIZE)
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1) if n_pages > 1 else 1
+        start = (page - 1) * TABLE_PAGE_SIZE
+        # Round to 2 decimal places in one vectorized step
+        st.dataframe(prediction_df.iloc[start:start + TABLE_PAGE_SIZE].round(2), use_container_width=True)
+        if n_pages > 1:
+            st.caption(f"Stations {start + 1}-{min(start + TABLE_PAGE_SIZE, len(prediction_df))} "
+                       f"of {len(prediction_df)}, ranked by predicted demand.")
         
         # Display predictions section
         st.write("### Visualization")
         
         # Create tabs for different visualizations
-        tab1, tab2 = st.tabs(["Bar Chart", "Geographic Distribution"])
+        tab1, tab2, tab3 = st.tabs(["Bar Chart", "Geographic Distribution", "Forecast Horizon"])
         
         with tab1:  
-            # Horizontal Bar Chart  
-            fig_bar = px.bar(prediction_df,  
+            # Horizontal Bar Chart of the highest-demand stations
+            top_df = prediction_df.head(TOP_STATIONS)
+            fig_bar = px.bar(top_df,  
                             x="Predicted Energy (kWh)",  # Switch x and y for horizontal bars
                             y="Station",  # Stations now appear on the y-axis
-                            title="Predicted Energy Demand by Station",  
+                            title="Predicted Energy Demand by Station" if len(top_df) == len(prediction_df)
+                            else f"Top {TOP_STATIONS} Stations by Predicted Demand",  
+                            error_x="Spread (kWh)" if member_values else None,
                             color_discrete_sequence=["#636EFA"]  # Use a single color for all bars (default Plotly blue)
                             )  
 
@@ -127,29 +272,77 @@ def render():
 
        
         with tab2:
-            # Geographic distribution
-            # Get original lat/long data
-            station_locations = ev_session_df.groupby('Station').agg({
-                'Latitude': 'first',
-                'Longitude': 'first'
-            })
-        
+            # Geographic distribution, clustered per map tile so the payload stays bounded
+            detail = st.select_slider("Map detail", options=list(MAP_DETAIL), value="Auto")
+            # The daily state is shared with other sessions and the CLI, so its index follows the stations
+            # it holds rather than the delta that was uploaded
+            dataset_digest = upload_digest if input_mode == "Full history" else stations_digest(ev_session_df)
+            station_index = load_station_index(f"{input_mode}:{dataset_digest}", ev_session_df)
             
-            # Merge with predictions
-            geo_data = station_locations.merge(prediction_df, left_index=True, right_on='Station')
+            zoom = MAP_DETAIL[detail]
+            if detail == "Auto" and len(station_index) > MAP_POINTS:
+                zoom = auto_zoom(station_index, MAP_POINTS)
+            geo_data = cluster(station_index, pd.Series(predicted_values, index=station_names), zoom)
             
-            # Create map
+            # Create map; marker sizes cannot be negative
             fig_map = px.scatter_mapbox(geo_data,
                                       lat='Latitude',
                                       lon='Longitude',
-                                      size='Predicted Energy (kWh)',
+                                      size=geo_data['Predicted Energy (kWh)'].clip(lower=0),
                                       color='Predicted Energy (kWh)',
                                       hover_name='Station',
+                                      hover_data={'Stations': True},
                                       zoom=6,
                                       title="Geographic Distribution of Predicted Demand")
             
             fig_map.update_layout(mapbox_style="carto-positron")
             st.plotly_chart(fig_map, use_container_width=True)
+            if zoom is not None:
+                st.caption(f"{len(station_index)} stations grouped into {len(geo_data)} clusters "
+                           f"on zoom-{zoom} map tiles; each marker sums its stations' demand.")
+        
+        with tab3:
+            if steps == 1:
+                st.info("Increase the forecast horizon to see demand over the coming days.")
+            else:
+                # Demand per period and station over the horizon
+                dates = horizon_dates(temporal_data.index[-1], steps, FREQUENCIES[granularity])
+                # One line per station is drawn for the stations with the most demand over the horizon
+                top = np.sort(np.argsort(-horizon_values.sum(axis=0), kind="stable")[:TOP_STATIONS])
+                horizon_df = pd.DataFrame({
+                    "Date": dates.repeat(len(top)),
+                    "Station": np.tile(station_names[top], steps),
+                    "Predicted Energy (kWh)": horizon_values[:, top].ravel()
+                })
+                total_df = pd.DataFrame({
+                    "Date": dates,
+                    "Predicted Energy (kWh)": horizon_values.sum(axis=1)
+                })
+                
+                fig_total = px.line(total_df,
+                                    x="Date",
+                                    y="Predicted Energy (kWh)",
+                                    markers=True,
+                                    title=f"Total Predicted Demand over the Next {horizon} Days")
+                if member_values:
+                    # Band of one standard deviation of the members' totals around the ensemble mean
+                    totals_spread = np.std([values.sum(axis=1) for values in member_values.values()], axis=0)
+                    fig_total.add_trace(go.Scatter(x=dates, y=total_df["Predicted Energy (kWh)"] + totals_spread,
+                                                   mode="lines", line=dict(width=0), showlegend=False,
+                                                   hoverinfo="skip"))
+                    fig_total.add_trace(go.Scatter(x=dates, y=total_df["Predicted Energy (kWh)"] - totals_spread,
+                                                   mode="lines", line=dict(width=0), fill="tonexty",
+                                                   fillcolor="rgba(99, 110, 250, 0.2)",
+                                                   name="Spread across models"))
+                st.plotly_chart(fig_total, use_container_width=True)
+                
+                fig_horizon = px.line(horizon_df,
+                                      x="Date",
+                                      y="Predicted Energy (kWh)",
+                                      color="Station",
+                                      title="Predicted Demand by Station" if len(top) == len(station_names)
+                                      else f"Predicted Demand of the Top {TOP_STATIONS} Stations")
+                st.plotly_chart(fig_horizon, use_container_width=True)
         
         
         # Add custom CSS to make the font size smaller for the values in the metrics
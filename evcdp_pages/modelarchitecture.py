@@ -125,6 +125,7 @@ def render():
         1. **Input/Output Consistency**
             - Input shape: (None, 7, 14)
             - Output shape: (None, 14)
+            - Networks with more (or fewer) stations are forecast in groups of 14 stations, zero-padded and batched together
             
         2. **Architectural Patterns**
             - Gradual dimension reduction (64 → 32 → 14)
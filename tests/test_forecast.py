@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+import pytest
+
+from evcdp_core.forecast import WINDOW_DAYS, forecast_horizon
+from evcdp_core.npmodel import load_numpy_model
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cnnlstm_ev_model.h5")
+
+
+# One station group at a time, padded with stations that are reset to zero after every step
+def _reference_forecast(model, window, horizon):
+    width = model.input_shape[-1]
+    predicted = []
+    for start in range(0, window.shape[1], width):
+        stations = window[:, start:start + width]
+        group = np.zeros((WINDOW_DAYS, width), dtype=np.float32)
+        group[:, :stations.shape[1]] = stations
+        steps = []
+        for _ in range(horizon):
+            step = model.predict(group[np.newaxis], verbose=0)[0]
+            step[stations.shape[1]:] = 0
+            steps.append(step[:stations.shape[1]])
+            group = np.vstack([group[1:], step])
+        predicted.append(np.stack(steps))
+    return np.concatenate(predicted, axis=1)
+
+
+# Windows whose last station group is padded must not feed predictions for the padding back in
+@pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="cnnlstm_ev_model.h5 not found")
+def test_horizon_matches_per_group_loop():
+    model = load_numpy_model(MODEL_PATH, memory_map=False)
+    rng = np.random.default_rng(0)
+    windows = [rng.random((WINDOW_DAYS, stations), dtype=np.float32) for stations in (37, 14, 5)]
+
+    for window, predicted in zip(windows, forecast_horizon(model, windows, 10)):
+        assert predicted.shape == (10, window.shape[1])
+        np.testing.assert_allclose(predicted, _reference_forecast(model, window, 10), atol=1e-5)
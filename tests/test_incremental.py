@@ -0,0 +1,101 @@
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_sessions
+from evcdp_core.forecast import PREDICTION_COLUMN, forecast
+from evcdp_core.incremental import (
+    apply_delta,
+    forecast_state,
+    init_state,
+    load_state,
+    save_state,
+    update_state,
+)
+from evcdp_core.ingest import aggregate_daily, load_sessions
+from evcdp_core.npmodel import load_numpy_model
+from evcdp_core.scaler import fit_scaler
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cnnlstm_ev_model.h5")
+DELTA_DAYS = 3
+
+
+# Dense enough that every station has sessions on every day
+@pytest.fixture(scope="module")
+def sessions(tmp_path_factory):
+    path = write_sessions(str(tmp_path_factory.mktemp("data") / "sessions.csv"), 8000, 20, days=30)
+    return pd.read_csv(path)
+
+
+def _csv(frame):
+    return frame.to_csv(index=False).encode()
+
+
+# The history without its last days, and one delta file per remaining day
+def _split(sessions):
+    days = sessions['Timestamp'].str[:10]
+    last_days = sorted(days.unique())[-DELTA_DAYS:]
+    history = sessions[days < last_days[0]]
+    return io.BytesIO(_csv(history)), [_csv(sessions[days == day]) for day in last_days]
+
+
+@pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="cnnlstm_ev_model.h5 not found")
+def test_deltas_match_full_history(sessions):
+    model = load_numpy_model(MODEL_PATH, memory_map=False)
+    daily = aggregate_daily(load_sessions(io.BytesIO(_csv(sessions))))
+    scaler = fit_scaler(daily)
+
+    history, deltas = _split(sessions)
+    state = init_state(history)
+    for delta in deltas:
+        state, applied = apply_delta(state, delta)
+        assert applied
+
+    expected, _ = forecast(model, {"full": daily}, horizon=2, scaler=scaler)
+    actual = forecast_state(model, state, horizon=2, scaler=scaler)
+    pd.testing.assert_series_equal(actual["Station"], expected["Station"])
+    np.testing.assert_array_equal(actual["Date"].to_numpy(), expected["Date"].to_numpy())
+    np.testing.assert_allclose(actual[PREDICTION_COLUMN], expected[PREDICTION_COLUMN], rtol=1e-6)
+
+
+def test_same_delta_is_applied_once(sessions):
+    history, deltas = _split(sessions)
+    state, applied = apply_delta(init_state(history), deltas[0])
+    assert applied
+
+    again, applied = apply_delta(state, deltas[0])
+    assert not applied
+    np.testing.assert_array_equal(again["energy"], state["energy"])
+
+
+def test_day_older_than_window_is_ignored(sessions):
+    state = init_state(io.BytesIO(_csv(sessions)))
+    days = sessions['Timestamp'].str[:10]
+    old_day = sorted(days.unique())[0]
+
+    updated, applied = apply_delta(state, _csv(sessions[days == old_day]))
+    assert applied
+    np.testing.assert_array_equal(updated["days"], state["days"])
+    np.testing.assert_array_equal(updated["energy"], state["energy"])
+
+
+# Concurrent updates of one state file are serialized, so no delta is lost
+def test_concurrent_updates_keep_every_delta(sessions, tmp_path):
+    history, deltas = _split(sessions)
+    path = str(tmp_path / "state.npz")
+    save_state(init_state(history), path)
+
+    threads = [threading.Thread(target=update_state, args=([delta], path)) for delta in deltas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected = init_state(io.BytesIO(_csv(sessions)))
+    state = load_state(path)
+    assert len(state["applied"]) == len(deltas)
+    np.testing.assert_allclose(state["energy"].sum(), expected["energy"].sum())
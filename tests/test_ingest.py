@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_sessions
+from evcdp_core.ingest import aggregate_daily, aggregate_daily_chunked, load_sessions
+
+
+@pytest.fixture(scope="module")
+def sessions_path(tmp_path_factory):
+    return write_sessions(str(tmp_path_factory.mktemp("data") / "sessions.csv"), 20_000, 40, days=60)
+
+
+def _ordered(daily):
+    return daily.sort_values(["Station", "Timestamp"], ignore_index=True)
+
+
+# Chunk boundaries split days and stations; the combined totals must not depend on them
+@pytest.mark.parametrize("chunksize", [1000, 7777, 500_000])
+@pytest.mark.parametrize("freq", ["D", "h"])
+def test_chunked_matches_in_memory(sessions_path, chunksize, freq):
+    expected = _ordered(aggregate_daily(load_sessions(sessions_path), freq))
+    actual = _ordered(aggregate_daily_chunked(sessions_path, chunksize=chunksize, freq=freq))
+    pd.testing.assert_frame_equal(actual[expected.columns], expected, check_dtype=False, check_categorical=False)
@@ -0,0 +1,21 @@
+import os
+
+import numpy as np
+import pytest
+
+from evcdp_core.npmodel import load_numpy_model
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cnnlstm_ev_model.h5")
+
+
+# The NumPy forward pass must reproduce Keras on the shipped CNN-LSTM
+@pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="cnnlstm_ev_model.h5 not found")
+def test_numpy_model_matches_keras():
+    pytest.importorskip("tensorflow")
+    from evcdp_core.forecast import load_forecast_model
+
+    numpy_model = load_numpy_model(MODEL_PATH, memory_map=False)
+    keras_model = load_forecast_model(MODEL_PATH, backend="keras")
+
+    inputs = np.random.default_rng(0).random((256,) + numpy_model.input_shape[1:], dtype=np.float32)
+    np.testing.assert_allclose(numpy_model.predict(inputs), keras_model.predict(inputs, verbose=0), atol=1e-5)
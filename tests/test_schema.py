@@ -0,0 +1,59 @@
+import io
+
+import pandas as pd
+import pytest
+
+from evcdp_core.schema import SchemaError, iter_csv, read_csv, validate
+
+HEADER = "Timestamp,Station,Energy Delivered (kWh),Duration (mins),Latitude,Longitude\n"
+VALID = HEADER + "2023-01-01 10:00:00,Station 001,5.5,10,3.1,101.5\n2023-01-02T11:00:00,Station 002,4,20,,\n"
+
+
+def _read_whole(source):
+    return validate(read_csv(source))
+
+
+def _read_chunked(source):
+    return pd.concat([validate(chunk) for chunk in iter_csv(source, chunksize=1)], ignore_index=True)
+
+
+readers = pytest.mark.parametrize("read", [_read_whole, _read_chunked], ids=["read_csv", "iter_csv"])
+
+
+@readers
+def test_valid_log_is_typed(read):
+    frame = read(io.BytesIO(VALID.encode()))
+    assert len(frame) == 2
+    assert pd.api.types.is_datetime64_any_dtype(frame["Timestamp"])
+    assert frame["Energy Delivered (kWh)"].dtype == "float64"
+    # Sessions without coordinates are kept
+    assert frame["Latitude"].isna().sum() == 1
+
+
+# Text streams are accepted like binary ones
+@readers
+def test_text_stream(read):
+    assert len(read(io.StringIO(VALID))) == 2
+
+
+@pytest.mark.parametrize("content, message", [
+    ("Timestamp,Station,Energy Delivered (kWh)\n2023-01-01,A,1\n", "missing the column"),
+    (HEADER + "yesterday,A,5,10,3,101\n", "Could not parse"),
+    (HEADER + "2023-01-01 10:00:00,A,five,10,3,101\n", "Could not parse"),
+    (HEADER + ",A,5,10,3,101\n", "no Timestamp"),
+    (HEADER + "2023-01-01 10:00:00,A,-5,10,3,101\n", "negative Energy Delivered"),
+    (HEADER + "2023-01-01 10:00:00,A,5,10,95,101\n", "Latitude outside"),
+    (HEADER + "2023-01-01 10:00:00,A,5,10,3,181\n", "Longitude outside"),
+], ids=["missing column", "non-ISO timestamp", "non-numeric energy", "empty timestamp", "negative energy",
+        "latitude", "longitude"])
+@readers
+def test_invalid_log(read, content, message):
+    with pytest.raises(SchemaError, match=message):
+        read(io.BytesIO(content.encode()))
+
+
+# Problems are reported with their count and first data row
+def test_error_reports_first_row():
+    content = HEADER + "2023-01-01 10:00:00,A,5,10,3,101\n" + "2023-01-01 10:00:00,A,-5,10,3,101\n" * 2
+    with pytest.raises(SchemaError, match=r"2 row\(s\) with negative .* \(first at data row 2\)"):
+        validate(read_csv(io.BytesIO(content.encode())))